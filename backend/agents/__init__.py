@@ -6,11 +6,13 @@ from .data_validation_agent import DataValidationAgent
 from .enrichment_agent import EnrichmentAgent
 from .qa_agent import QAAgent
 from .directory_agent import DirectoryManagementAgent
+from .errors import AgentError
 
 __all__ = [
     "DataValidationAgent",
     "EnrichmentAgent",
     "QAAgent",
-    "DirectoryManagementAgent"
+    "DirectoryManagementAgent",
+    "AgentError"
 ]
 
@@ -35,7 +35,7 @@ class DataValidationAgent:
 
         # Add more field-level checks as needed...
 
-        logger.info(f"Validated provider {validated.get('id')}: {len(issues)} issues")
+        logger.info("Validated provider %s: %s issues", validated.get("id"), len(issues))
         return {
             "validated_data": validated,
             "issues": issues,
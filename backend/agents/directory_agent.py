@@ -3,6 +3,7 @@ Directory Management Agent for MedAtlas.
 Manages final provider profiles through auto-correction and data merging.
 """
 
+import csv
 import json
 import logging
 import os
@@ -56,7 +57,7 @@ class DirectoryManagementAgent:
             elif enriched.get(field) is not None and enriched.get(field) != '':
                 if corrected.get(field) is None or corrected.get(field) == '':
                     corrected[field] = enriched[field]
-                    logger.debug(f"Filled missing {field} with enriched data")
+                    logger.debug("Filled missing %s with enriched data", field)
         
         return corrected
     
@@ -89,6 +90,7 @@ class DirectoryManagementAgent:
                 'npi_valid',
                 'phone_valid',
                 'validation_status',
+                'cached_discrepancies',
             ]:
                 continue
             
@@ -207,7 +209,7 @@ class DirectoryManagementAgent:
             os.makedirs(exports_dir, exist_ok=True)
 
             # Load providers from DB (directory view source of truth)
-            providers = get_all_providers(limit=100000, offset=0)
+            providers = get_all_providers(limit=100000)
 
             if provider_ids:
                 id_set = set(provider_ids)
@@ -231,6 +233,7 @@ class DirectoryManagementAgent:
                 base_provider = p.copy()
                 base_provider.pop("validated_data", None)
                 base_provider.pop("enriched_data", None)
+                base_provider.pop("cached_discrepancies", None)
 
                 final_provider = self.run(
                     provider=base_provider,
@@ -264,8 +267,6 @@ class DirectoryManagementAgent:
                     json.dump(final_directory, f, ensure_ascii=False, default=str, indent=2)
             else:
                 # CSV export
-                import csv
-
                 # Determine CSV header from union of keys to be robust to partial data
                 header_fields = set()
                 for row in final_directory:
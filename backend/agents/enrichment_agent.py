@@ -477,8 +477,10 @@
 
 
 import logging
+import os
 from typing import Dict, Any, Optional
 
+from backend.agents.errors import AgentError
 from backend.database import log_event
 
 logger = logging.getLogger(__name__)
@@ -502,10 +504,16 @@ class EnrichmentAgent:
 
         Returns:
             Enriched provider data (dict).
+
+        Raises:
+            AgentError: pdf_path was given but the file does not exist.
         """
         provider_id = validated_data.get("id")
         npi = validated_data.get("npi")
 
+        if pdf_path is not None and not os.path.isfile(pdf_path):
+            raise AgentError(self.name, f"document {pdf_path} for provider {provider_id} not found")
+
         log_event(
             "enrichment_start",
             f"Starting enrichment for provider {npi}",
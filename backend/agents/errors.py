@@ -0,0 +1,16 @@
+"""
+Exceptions raised by MedAtlas agents.
+"""
+
+
+class AgentError(Exception):
+    """
+    A recoverable failure while an agent processes one provider.
+    
+    The pipeline marks that provider needs_review and carries on; any other
+    exception is treated as a bug and logged as such.
+    """
+    
+    def __init__(self, agent_name: str, message: str):
+        super().__init__(f"{agent_name}: {message}")
+        self.agent_name = agent_name
@@ -3,9 +3,10 @@ QA Agent for MedAtlas.
 Compares data sources and detects inconsistencies.
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
-from backend.database import insert_discrepancy, log_event
+from backend.database import insert_discrepancies_bulk, log_event
 from backend.database import update_provider_after_validation
 
 
@@ -21,7 +22,8 @@ class QAAgent:
     async def run(self, original: Dict[str, Any], 
                   validated_data: Dict[str, Any],
                   enriched_data: Dict[str, Any],
-                  confidence_scores: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+                  confidence_scores: Optional[Dict[str, int]] = None,
+                  persist: bool = True) -> Dict[str, Any]:
         """
         Main QA analysis method.
         
@@ -30,9 +32,12 @@ class QAAgent:
             validated_data: Validated data from validation agent
             enriched_data: Enriched data from enrichment agent
             confidence_scores: Dictionary of confidence scores by field
+            persist: Write the provider update and discrepancies now. Batch
+                callers pass False and write discrepancy_records themselves.
             
         Returns:
-            Dictionary with confidence score, status, and discrepancies
+            Dictionary with confidence score, status, discrepancies and
+            discrepancy_records (rows for the discrepancies table)
         """
         log_event("qa_start", 
                  f"Starting QA analysis for provider {original.get('npi')}", 
@@ -50,40 +55,29 @@ class QAAgent:
         
         # Determine status based on confidence
         status = await self.determine_status(final_confidence)
-
-        update_provider_after_validation(original.get("id"),
-    {
-        "validation_status": status,
-        "confidence_score": final_confidence,
-        "validated_data": validated_data,
-        "enriched_data": enriched_data
-    }
-)
-        
-        # Insert discrepancies into database
-        discrepancy_ids = []
-        for disc in discrepancies:
+        
+        discrepancy_records = self.discrepancy_records(original, discrepancies)
+        
+        if persist:
+            # SQLite writes block, so they run in a worker thread instead of on the event loop
+            await asyncio.to_thread(update_provider_after_validation, original.get("id"), {
+                "validation_status": status,
+                "confidence_score": final_confidence,
+                "validated_data": validated_data,
+                "enriched_data": enriched_data
+            })
+            
+            # Insert all discrepancies for this provider in one statement
             try:
-                disc_id = insert_discrepancy({
-                    "provider_id": original.get('id'),
-                    "field_name": disc.get("field"),
-                    "csv_value": str(disc.get("original", "")),
-                    "api_value": str(disc.get("updated", "")),
-                    "scraped_value": None,
-                    "final_value": str(disc.get("updated", "")),
-                    "confidence": 80,
-                    "risk_level": "high" if disc.get("field") in ['npi', 'license_number'] else "medium",
-                    "status": "open",
-                    "notes": f"Value mismatch: {disc.get('original')} → {disc.get('updated')}"
-                })
-                discrepancy_ids.append(disc_id)
+                await asyncio.to_thread(insert_discrepancies_bulk, discrepancy_records)
             except Exception as e:
-                logger.error(f"Error inserting discrepancy: {e}")
+                logger.error("Error inserting discrepancies: %s", e)
         
         result = {
             "confidence_score": final_confidence,
             "status": status,
             "discrepancies": discrepancies,
+            "discrepancy_records": discrepancy_records,
             "discrepancy_count": len(discrepancies)
         }
         
@@ -93,6 +87,34 @@ class QAAgent:
         
         return result
     
+    def discrepancy_records(self, original: Dict[str, Any],
+                            discrepancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Turn compare_sources output into rows for the discrepancies table.
+        
+        Args:
+            original: Original CSV data (provides the provider id)
+            discrepancies: Discrepancies from compare_sources
+            
+        Returns:
+            List of discrepancy records for insert_discrepancies_bulk
+        """
+        return [
+            {
+                "provider_id": original.get('id'),
+                "field_name": disc.get("field"),
+                "csv_value": str(disc.get("original", "")),
+                "api_value": str(disc.get("updated", "")),
+                "scraped_value": None,
+                "final_value": str(disc.get("updated", "")),
+                "confidence": 80,
+                "risk_level": "high" if disc.get("field") in ['npi', 'license_number'] else "medium",
+                "status": "open",
+                "notes": f"Value mismatch: {disc.get('original')} → {disc.get('updated')}"
+            }
+            for disc in discrepancies
+        ]
+    
     async def compare_sources(self, original: Dict[str, Any], 
                              validated: Dict[str, Any],
                              enriched: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -146,7 +168,7 @@ class QAAgent:
                         }
                         discrepancies.append(discrepancy)
             except Exception as e:
-                logger.error(f"Error comparing field {field}: {e}")
+                logger.error("Error comparing field %s: %s", field, e)
                 continue
         
         return discrepancies
@@ -12,11 +12,19 @@ from backend.models import (
     make_discrepancy,
     DiscrepancyUpdate,
 )
-from backend.database import get_discrepancies, get_provider
+from backend.database import get_db_connection, get_discrepancies, get_provider, get_read_connection
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Discrepancy field names, resolved once instead of per row
+_DISC_FIELDS = tuple(Discrepancy.model_fields.keys())
+
+
+def _row_to_disc(row: Any) -> Discrepancy:
+    """Build a Discrepancy from a DB row (sqlite3.Row or dict); validation parses created_at."""
+    return make_discrepancy({k: row[k] for k in _DISC_FIELDS})
+
 
 @router.get("/discrepancies", response_model=List[Discrepancy])
 async def get_discrepancies_endpoint(
@@ -28,16 +36,9 @@ async def get_discrepancies_endpoint(
     """
     try:
         rows = get_discrepancies(provider_id=provider_id, status=status)
-
-        # rows may be dicts or DB row objects; normalize to dict first
-        result: List[Discrepancy] = []
-        for row in rows:
-            data = dict(row) if not isinstance(row, dict) else row
-            result.append(make_discrepancy(data))
-
-        return result
+        return [_row_to_disc(row) for row in rows]
     except Exception as e:
-        logger.error(f"Error getting discrepancies: {e}")
+        logger.error("Error getting discrepancies: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -46,10 +47,9 @@ async def get_discrepancy(discrepancy_id: int):
     """
     Get a specific discrepancy by ID.
     """
-    from backend.database import get_db_connection
 
     try:
-        with get_db_connection() as conn:
+        with get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT * FROM discrepancies WHERE id = ?",
@@ -60,12 +60,11 @@ async def get_discrepancy(discrepancy_id: int):
             if not row:
                 raise HTTPException(status_code=404, detail="Discrepancy not found")
 
-            data = dict(row) if not isinstance(row, dict) else row
-            return make_discrepancy(data)
+            return _row_to_disc(row)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting discrepancy: {e}")
+        logger.error("Error getting discrepancy: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -77,7 +76,6 @@ async def update_discrepancy(discrepancy_id: int, body: DiscrepancyUpdate):
     The frontend sends JSON like:
       { "status": "resolved", "notes": "Resolved manually" }
     """
-    from backend.database import get_db_connection
 
     try:
         with get_db_connection() as conn:
@@ -98,23 +96,16 @@ async def update_discrepancy(discrepancy_id: int, body: DiscrepancyUpdate):
                 raise HTTPException(status_code=400, detail="No updates provided")
 
             params.append(discrepancy_id)
-            query = f"UPDATE discrepancies SET {', '.join(updates)} WHERE id = ?"
-            cursor.execute(query, params)
-            conn.commit()
+            # RETURNING hands back the updated row, no follow-up SELECT needed
+            query = f"UPDATE discrepancies SET {', '.join(updates)} WHERE id = ? RETURNING *"
+            row = cursor.execute(query, params).fetchone()
 
-            if cursor.rowcount == 0:
+            if row is None:
                 raise HTTPException(status_code=404, detail="Discrepancy not found")
 
-            # Return updated discrepancy
-            cursor.execute(
-                "SELECT * FROM discrepancies WHERE id = ?",
-                (discrepancy_id,),
-            )
-            row = cursor.fetchone()
-            data = dict(row) if not isinstance(row, dict) else row
-            return make_discrepancy(data)
+            return _row_to_disc(row)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating discrepancy: {e}")
+        logger.error("Error updating discrepancy: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
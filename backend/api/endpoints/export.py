@@ -13,6 +13,8 @@ from backend.agents import DirectoryManagementAgent
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+directory_agent = DirectoryManagementAgent()
+
 
 @router.post("/export")
 async def export_directory(request: ExportRequest):
@@ -26,7 +28,6 @@ async def export_directory(request: ExportRequest):
         Export file information
     """
     try:
-        directory_agent = DirectoryManagementAgent()
         result = await directory_agent.export_directory(
             format=request.format,
             provider_ids=request.provider_ids,
@@ -35,7 +36,7 @@ async def export_directory(request: ExportRequest):
         return result
 
     except Exception as e:
-        logger.error(f"Error exporting directory: {e}")
+        logger.error("Error exporting directory: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -72,5 +73,5 @@ async def download_export(filename: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error downloading file: {e}")
+        logger.error("Error downloading file: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
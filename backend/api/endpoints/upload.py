@@ -12,73 +12,67 @@ import os
 import shutil
 import tempfile
 
-from backend.pipeline.main import PipelineOrchestrator
+from backend.database import log_event
+from backend.main import orchestrator
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-orchestrator = PipelineOrchestrator()
-
 
 @router.post("/providers/upload")
 async def upload_providers(
-    csv_file: UploadFile = File(...),
-    pdf_files: List[UploadFile] = File(default=[]),
+    file: UploadFile = File(...),                       # CSV
+    pdf_files: List[UploadFile] = File(default=[]),     # optional PDFs
     run_validation: bool = Form(True),
 ):
     """
-    Upload provider CSV + optional PDFs and process through the pipeline.
+    Upload provider CSV + optional PDFs and run the 4‑agent validation pipeline.
 
-    Body (multipart/form-data):
-        csv_file: CSV file with provider records (required)
-        pdf_files: One or more PDF files (optional, repeated field)
-        run_validation: Whether to run validation immediately (currently informational)
+    - CSV rows are processed by PipelineOrchestrator.process_from_csv
+      (which internally uses DataValidationAgent, EnrichmentAgent,
+       QAAgent, DirectoryManagementAgent).
+    - pdf_files are saved and mapped by filename (without extension) to NPI.
     """
     try:
-        # Basic validation on CSV
-        if csv_file.content_type not in ("text/csv", "application/vnd.ms-excel"):
-            raise HTTPException(status_code=400, detail="csv_file must be a CSV")
-
-        # Create temporary directory
+        # --- save CSV to a temp dir ---
         tmp_dir = tempfile.mkdtemp()
-
-        # Save CSV
-        csv_path = os.path.join(tmp_dir, csv_file.filename)
+        csv_path = os.path.join(tmp_dir, file.filename)
         with open(csv_path, "wb") as f:
-            shutil.copyfileobj(csv_file.file, f)
+            shutil.copyfileobj(file.file, f)
 
-        # Save PDFs and build {NPI-ish: path} mapping
+        # --- save PDFs and build {npi_like: path} mapping ---
         pdf_paths: Dict[str, str] = {}
         for pdf in pdf_files:
             if pdf.content_type != "application/pdf":
-                # ignore non‑PDFs silently; could also raise
                 continue
-
             pdf_path = os.path.join(tmp_dir, pdf.filename)
             with open(pdf_path, "wb") as f:
                 shutil.copyfileobj(pdf.file, f)
-
-            # Simple heuristic: use filename (without extension) as key,
-            # e.g. "1234567890.pdf" -> "1234567890" (expected NPI)
+            # assume filename like "1234567890.pdf" where 1234567890 is NPI
             npi_key = os.path.splitext(pdf.filename)[0]
             pdf_paths[npi_key] = pdf_path
 
-        # Run pipeline from CSV using your orchestrator
-        results = await orchestrator.process_from_csv(
-            csv_path=csv_path,
-            pdf_paths=pdf_paths or None,
+        # --- call orchestrator (validation agent lives inside this) ---
+        if run_validation:
+            results = await orchestrator.process_from_csv(
+                csv_path=csv_path,
+                pdf_paths=pdf_paths or None,
+            )
+        else:
+            # if someone disables validation, still use orchestrator but ignore PDFs
+            results = await orchestrator.process_from_csv(csv_path=csv_path)
+
+        imported_count = len(results)
+
+        log_event(
+            "upload",
+            f"Uploaded and processed {imported_count} providers from {file.filename}",
+            None,
         )
-
-        imported_count = len(results) if results is not None else 0
-
-        # Optionally you can add a real validation_run_id if you track jobs
-        return {
-            "imported_count": imported_count,
-            "validation_run_id": None,
-        }
+        return {"uploaded": imported_count, "processed": imported_count}
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"Error uploading providers: {e}")
-        raise HTTPException(status_code=500, detail="Upload failed")
+        logger.error("Unexpected error during upload: %s", e)
+        raise HTTPException(status_code=500, detail="Upload and validation failed")
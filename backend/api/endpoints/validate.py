@@ -3,20 +3,39 @@ Validation endpoints for MedAtlas API.
 """
 
 from fastapi import APIRouter, HTTPException, File, UploadFile
+from fastapi.responses import ORJSONResponse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
 import logging
 import os
+import tempfile
+from pathlib import Path
 
 from backend.models import ValidationRequest
-from backend.ocr import extract_from_pdf_bytes
-from backend.main import PipelineOrchestrator  # orchestrator with 4 agents
+from backend.database import (
+    get_provider,
+    get_provider_by_npi,
+    get_cached_ocr_result,
+    cache_ocr_result,
+)
+from backend.pipeline import run_validation_pipeline
+from backend.ocr import extract_text_from_pdf_parallel
+from backend.main import orchestrator  # shared orchestrator with 4 agents
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "uploads")
-os.makedirs(UPLOADS_DIR, exist_ok=True)
+# Resolved to an absolute path once, so temp files skip the '..' walk
+UPLOADS_DIR = Path(__file__).resolve().parents[3] / "uploads"
+UPLOADS_DIR.mkdir(exist_ok=True)
 
-orchestrator = PipelineOrchestrator()
+# Copy buffer for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# OCR is CPU-bound; run it in worker processes so the event loop stays free.
+# Shut down by the app lifespan in api_main.
+OCR_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
 
 
 @router.post("/validate")
@@ -25,11 +44,10 @@ async def validate_all_providers():
     Run validation pipeline for all providers.
     """
     try:
-        from backend.pipeline import run_validation_pipeline
         result = await run_validation_pipeline()
         return result
     except Exception as e:
-        logger.error(f"Error running validation pipeline: {e}", exc_info=True)
+        logger.exception("Error running validation pipeline: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -42,43 +60,89 @@ async def validate_single_provider(provider_id: int):
         result = await orchestrator.process_provider(provider_id)
         return result
     except Exception as e:
-        logger.error(f"Error validating provider {provider_id}: {e}", exc_info=True)
+        logger.exception("Error validating provider %s: %s", provider_id, e)
         raise HTTPException(status_code=500, detail="Validation failed")
 
 
 @router.post("/validate-provider")
 async def validate_single_provider_legacy(request: ValidationRequest):
     """
-    Legacy endpoint – still runs full pipeline but ignores request details.
+    Legacy endpoint – runs the 4‑agent pipeline for the requested provider only.
     """
+    if request.provider_id is not None:
+        provider = get_provider(request.provider_id)
+    elif request.npi:
+        provider = get_provider_by_npi(request.npi)
+    else:
+        raise HTTPException(status_code=400, detail="provider_id or npi is required")
+    if not provider:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    provider_id = provider["id"]
+
+    # Already validated: answer from the provider row alone, discrepancies included
+    if provider.get("validation_status") == "validated" and not request.force_revalidate:
+        return ORJSONResponse({
+            "status": "success",
+            "message": "Provider already validated",
+            "result": {
+                "provider_id": provider_id,
+                "validated": True,
+                "confidence_score": provider.get("confidence_score") or 0,
+                "discrepancies": json.loads(provider.get("cached_discrepancies") or "[]"),
+                "validated_data": provider.get("validated_data") or {},
+            },
+        })
+
     try:
-        from backend.pipeline import run_validation_pipeline
-        result = await run_validation_pipeline()
-        return {
+        result = await orchestrator.process_provider(
+            provider_id, force_revalidate=request.force_revalidate
+        )
+        # Pipeline output is plain JSON-able data; serialize it directly with
+        # orjson instead of walking it through jsonable_encoder first
+        return ORJSONResponse({
             "status": "success",
             "message": "Validation completed",
             "result": result,
-        }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error validating provider: {e}", exc_info=True)
+        logger.exception("Error validating provider %s: %s", provider_id, e)
         raise HTTPException(status_code=500, detail="Validation failed")
 
 
-@router.post("/upload-pdf")
+@router.post("/upload-pdf", response_class=ORJSONResponse)
 async def upload_pdf(file: UploadFile = File(...)):
     """
     Upload a PDF file for OCR extraction.
     """
+    tmp_path = None
     try:
-        content = await file.read()
-        result = extract_from_pdf_bytes(content)
+        # Stream the upload to disk instead of reading it into memory,
+        # hashing it on the way so repeat uploads can skip OCR
+        digest = hashlib.blake2b()
+        with tempfile.NamedTemporaryFile(delete=False, dir=UPLOADS_DIR, suffix=".pdf") as tmp:
+            tmp_path = tmp.name
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                tmp.write(chunk)
+        content_hash = digest.hexdigest()
+
+        result = get_cached_ocr_result(content_hash)
+        if result is None:
+            result = await extract_text_from_pdf_parallel(tmp_path, OCR_POOL)
+            if result.get("success"):
+                cache_ocr_result(content_hash, result)
 
-        return {
+        return ORJSONResponse({
             "success": result.get("success", False),
             "text": result.get("full_text", ""),
             "structured_data": result.get("structured_data", {}),
             "page_count": result.get("page_count", 0),
-        }
+        })
     except Exception as e:
-        logger.error(f"Error processing PDF: {e}")
+        logger.error("Error processing PDF: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
@@ -1,14 +1,29 @@
 # backend/api_main.py  (put it directly under backend/, not inside api/ if you prefer)
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from backend.api.endpoints.providers import router as providers_router
+from backend.api.endpoints.upload import router as upload_router
 from backend.api.endpoints.export import router as export_router
 from backend.api.endpoints.discrepancies import router as discrepancies_router
-from backend.api.endpoints.validate import router as validate_router
+from backend.api.endpoints.validate import OCR_POOL, router as validate_router
+from backend.scraping import close_session
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release the scrapers' pooled HTTP connections and the OCR worker processes
+    await close_session()
+    OCR_POOL.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,11 +33,17 @@ app.add_middleware(
         "https://med-atlas-lemon.vercel.app/"
     ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let Starlette answer preflights with set lookups;
+    # PATCH is used by /discrepancies/{id}
+    allow_methods=["GET", "POST", "PATCH", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+# Provider lists and OCR text compress well; skip tiny responses
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(providers_router)
+app.include_router(upload_router)
 app.include_router(export_router)
 app.include_router(discrepancies_router)
 app.include_router(validate_router)
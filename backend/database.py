@@ -3,31 +3,163 @@ Database module for MedAtlas.
 Handles SQLite database operations with clean separation for future PostgreSQL migration.
 """
 
+import asyncio
 import sqlite3
-import json
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import orjson
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Any, Tuple
 from contextlib import contextmanager
+import atexit
+import functools
+import logging
 import os
+import queue
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(obj: Any) -> str:
+    """Encode a value for a JSON TEXT column."""
+    return orjson.dumps(
+        obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
+
+
+_loads = orjson.loads
+
+
+def _pack(obj: Any) -> bytes:
+    """Encode a value for a provider JSON BLOB column (zlib-compressed orjson)."""
+    return zlib.compress(
+        orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+        1,
+    )
+
+
+def _unpack(value: Any) -> Any:
+    """Decode a provider JSON column; rows written before BLOB storage hold JSON TEXT."""
+    if isinstance(value, bytes):
+        value = zlib.decompress(value)
+    return _loads(value)
 
 
 # Database path
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "medatlas.db")
 
+# Applied once when the shared connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+# Writes go through one long-lived connection shared by all callers and
+# serialized by _LOCK. Autocommit mode (isolation_level=None) so transactions
+# are explicit below. Reads use per-thread connections (get_read_connection)
+# and never wait on _LOCK: under WAL they run alongside the writer.
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.RLock()
+_depth = 0
+_owner: Optional[int] = None  # thread holding the open write transaction
+_read_local = threading.local()
+
+
+def _connect(*pragmas: str) -> sqlite3.Connection:
+    # Large statement cache: helpers reuse a fixed set of SQL strings, so each
+    # is compiled once per connection rather than on every call
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                           cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
 
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    """
+    Context manager for database connections.
+    
+    Yields the shared connection while holding the lock. The outermost block
+    runs inside BEGIN ... COMMIT (ROLLBACK on error); nested blocks join the
+    same transaction.
+    """
+    global _CONN, _depth, _owner
+    with _LOCK:
+        if _CONN is None:
+            _CONN = _connect(*CONNECTION_PRAGMAS)
+        conn = _CONN
+        if _depth == 0:
+            conn.execute("BEGIN")
+            _owner = threading.get_ident()
+        _depth += 1
+        try:
+            yield conn
+            if _depth == 1:
+                conn.execute("COMMIT")
+        except BaseException:
+            if _depth == 1 and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            _depth -= 1
+            if _depth == 0:
+                _owner = None
+
+
+@contextmanager
+def get_read_connection():
+    """
+    Context manager for read-only queries.
+    
+    Yields this thread's own read connection without taking the write lock,
+    so reads never queue behind a write batch. Inside a get_db_connection
+    block on the same thread, the write connection is yielded instead so
+    the caller sees its own uncommitted changes.
+    """
+    if _owner == threading.get_ident():
+        yield _CONN
+        return
+    conn = getattr(_read_local, "conn", None)
+    if conn is None or _read_local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _connect("PRAGMA query_only=1", "PRAGMA temp_store=MEMORY",
+                        "PRAGMA cache_size=-16000", "PRAGMA mmap_size=268435456")
+        _read_local.conn = conn
+        _read_local.path = DB_PATH
+    yield conn
+
+
+# JSON array of a provider's discrepancies, newest first (same order as get_discrepancies)
+_CACHED_DISCREPANCIES_SQL = """
+    SELECT json_group_array(json(d)) FROM (
+        SELECT json_object(
+            'id', id, 'provider_id', provider_id, 'field_name', field_name,
+            'csv_value', csv_value, 'api_value', api_value,
+            'scraped_value', scraped_value, 'final_value', final_value,
+            'confidence', confidence, 'risk_level', risk_level,
+            'status', status, 'notes', notes, 'created_at', created_at
+        ) AS d
+        FROM discrepancies
+        WHERE provider_id = {provider_id}
+        ORDER BY created_at DESC, id DESC
+    )
+"""
+
+
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, decl: str) -> bool:
+    """Add a column to an existing table if it is missing. Returns True if added."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row["name"] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
 
 
 def init_database():
@@ -62,9 +194,11 @@ def init_database():
                 source_file TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                raw_data TEXT,
-                validated_data TEXT,
-                enriched_data TEXT
+                raw_data BLOB,
+                validated_data BLOB,
+                enriched_data BLOB,
+                cached_discrepancies TEXT,
+                provider_fingerprint TEXT
             )
         """)
         
@@ -102,6 +236,13 @@ def init_database():
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # Status lives in a single row (id = 1); fold any older history into it
+        cursor.execute("""
+            DELETE FROM validation_status
+            WHERE id <> (SELECT MAX(id) FROM validation_status)
+        """)
+        cursor.execute("UPDATE validation_status SET id = 1")
+        cursor.execute("INSERT OR IGNORE INTO validation_status (id, status) VALUES (1, 'idle')")
         
         # Logs table
         cursor.execute("""
@@ -117,7 +258,94 @@ def init_database():
             )
         """)
         
-        conn.commit()
+        # Indexes for the per-provider lookups and newest-first listings
+        # (providers.npi is already indexed by its UNIQUE constraint)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_disc_provider ON discrepancies(provider_id, status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_provider_created ON logs(provider_id, created_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_providers_created ON providers(created_at DESC, id DESC)")
+        
+        # Databases created before cached_discrepancies existed
+        if _ensure_column(cursor, "providers", "cached_discrepancies", "TEXT"):
+            cursor.execute(f"""
+                UPDATE providers SET cached_discrepancies = (
+                    {_CACHED_DISCREPANCIES_SQL.format(provider_id="providers.id")}
+                )
+            """)
+        
+        # Databases created before pipeline runs were fingerprinted
+        _ensure_column(cursor, "providers", "provider_fingerprint", "TEXT")
+        
+        # Keep providers.cached_discrepancies in step with the discrepancies table.
+        # Inserts refresh it once per provider (_refresh_cached_discrepancies)
+        # rather than from a row trigger that would rebuild it per inserted row.
+        # An update can move a row between providers, so it refreshes both.
+        cursor.execute("DROP TRIGGER IF EXISTS discrepancies_cache_insert")
+        cursor.execute("DROP TRIGGER IF EXISTS discrepancies_cache_update")
+        cursor.execute(f"""
+            CREATE TRIGGER discrepancies_cache_update
+            AFTER UPDATE ON discrepancies
+            BEGIN
+                UPDATE providers SET cached_discrepancies = (
+                    {_CACHED_DISCREPANCIES_SQL.format(provider_id="providers.id")}
+                )
+                WHERE id IN (OLD.provider_id, NEW.provider_id);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS discrepancies_cache_delete
+            AFTER DELETE ON discrepancies
+            BEGIN
+                UPDATE providers SET cached_discrepancies = (
+                    {_CACHED_DISCREPANCIES_SQL.format(provider_id="OLD.provider_id")}
+                )
+                WHERE id = OLD.provider_id;
+            END
+        """)
+        
+        # OCR results keyed by PDF content hash
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                content_hash TEXT PRIMARY KEY,
+                result TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+
+_PROVIDER_COLS = (
+    "npi", "first_name", "last_name", "organization_name", "provider_type",
+    "specialty", "address_line1", "address_line2", "city", "state", "zip_code",
+    "phone", "email", "website", "license_number", "license_state",
+    "practice_name", "confidence_score", "risk_score", "validation_status",
+    "source_file",
+)
+_PROVIDER_JSON_COLS = ("raw_data", "validated_data", "enriched_data")
+_PROVIDER_DEFAULTS = {"confidence_score": 0, "risk_score": 0, "validation_status": "pending"}
+
+# Provider columns other than the JSON blobs (raw/validated/enriched data, cached discrepancies)
+_PROVIDER_SCALAR_COLUMNS = ("id",) + _PROVIDER_COLS + ("created_at", "updated_at")
+
+_PROVIDER_INSERT_PREFIX = "INSERT INTO providers ({}) VALUES ".format(
+    ", ".join(_PROVIDER_COLS + _PROVIDER_JSON_COLS)
+)
+_PROVIDER_ROW_PLACEHOLDERS = "({})".format(", ".join("?" * len(_PROVIDER_COLS + _PROVIDER_JSON_COLS)))
+_INSERT_PROVIDER_SQL = _PROVIDER_INSERT_PREFIX + _PROVIDER_ROW_PLACEHOLDERS + " RETURNING id"
+
+# Rows per multi-row INSERT; keeps bound parameters well under SQLite's limit
+PROVIDER_INSERT_BATCH = 500
+
+
+def _provider_params(provider_data: Dict[str, Any], raw_data_json: Optional[str] = None) -> tuple:
+    """Bind parameters for _INSERT_PROVIDER_SQL; raw_data_json is raw_data already serialized."""
+    return (
+        tuple(provider_data.get(c, _PROVIDER_DEFAULTS.get(c)) for c in _PROVIDER_COLS)
+        + tuple(
+            zlib.compress(raw_data_json.encode(), 1)
+            if c == "raw_data" and raw_data_json is not None
+            else _pack(provider_data.get(c, {}))
+            for c in _PROVIDER_JSON_COLS
+        )
+    )
 
 
 def insert_provider(provider_data: Dict[str, Any]) -> int:
@@ -132,48 +360,69 @@ def insert_provider(provider_data: Dict[str, Any]) -> int:
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute(_INSERT_PROVIDER_SQL, _provider_params(provider_data))
+        return cursor.fetchone()[0]
+
+
+def insert_providers_bulk(providers: List[Dict[str, Any]],
+                          raw_data_json: Optional[List[str]] = None) -> List[int]:
+    """
+    Insert many providers in a single transaction.
+    
+    Args:
+        providers: List of provider dictionaries (same shape as insert_provider)
+        raw_data_json: Optional per-row raw_data already serialized to JSON
+            text, used instead of each provider's raw_data
         
-        # Prepare data
-        raw_data = json.dumps(provider_data.get('raw_data', {}))
-        validated_data = json.dumps(provider_data.get('validated_data', {}))
-        enriched_data = json.dumps(provider_data.get('enriched_data', {}))
-        
-        cursor.execute("""
-            INSERT INTO providers (
-                npi, first_name, last_name, organization_name, provider_type,
-                specialty, address_line1, address_line2, city, state, zip_code,
-                phone, email, website, license_number, license_state,
-                practice_name, confidence_score, risk_score, validation_status,
-                source_file, raw_data, validated_data, enriched_data
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            provider_data.get('npi'),
-            provider_data.get('first_name'),
-            provider_data.get('last_name'),
-            provider_data.get('organization_name'),
-            provider_data.get('provider_type'),
-            provider_data.get('specialty'),
-            provider_data.get('address_line1'),
-            provider_data.get('address_line2'),
-            provider_data.get('city'),
-            provider_data.get('state'),
-            provider_data.get('zip_code'),
-            provider_data.get('phone'),
-            provider_data.get('email'),
-            provider_data.get('website'),
-            provider_data.get('license_number'),
-            provider_data.get('license_state'),
-            provider_data.get('practice_name'),
-            provider_data.get('confidence_score', 0),
-            provider_data.get('risk_score', 0),
-            provider_data.get('validation_status', 'pending'),
-            provider_data.get('source_file'),
-            raw_data,
-            validated_data,
-            enriched_data
-        ))
+    Returns:
+        IDs of the inserted providers, in input order
+    """
+    if not providers:
+        return []
+    if raw_data_json is not None and len(raw_data_json) != len(providers):
+        raise ValueError(
+            f"raw_data_json has {len(raw_data_json)} rows for {len(providers)} providers"
+        )
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if raw_data_json is None:
+            rows = [_provider_params(p) for p in providers]
+        else:
+            rows = [_provider_params(p, raw) for p, raw in zip(providers, raw_data_json)]
         
-        return cursor.lastrowid
+        # executemany drops RETURNING rows, so insert multi-row VALUES batches
+        ids: List[int] = []
+        for start in range(0, len(rows), PROVIDER_INSERT_BATCH):
+            batch = rows[start:start + PROVIDER_INSERT_BATCH]
+            cursor.execute(
+                _PROVIDER_INSERT_PREFIX
+                + ", ".join([_PROVIDER_ROW_PLACEHOLDERS] * len(batch))
+                + " RETURNING id",
+                [value for row in batch for value in row],
+            )
+            # RETURNING order is unspecified; AUTOINCREMENT ids follow input order
+            ids.extend(sorted(row[0] for row in cursor.fetchall()))
+        return ids
+
+
+@functools.lru_cache(maxsize=64)
+def _update_sql(cols: Tuple[str, ...]) -> str:
+    """UPDATE statement for one set of provider columns (always bumps updated_at)."""
+    assignments = [f"{col} = ?" for col in cols] + ["updated_at = CURRENT_TIMESTAMP"]
+    return f"UPDATE providers SET {', '.join(assignments)} WHERE id = ?"
+
+
+def _update_values(cols: Tuple[str, ...], updates: Dict[str, Any]) -> List[Any]:
+    """Values for _update_sql(cols), JSON columns serialized."""
+    values = []
+    for key in cols:
+        value = updates[key]
+        # Serialize JSON fields; already-encoded values pass through
+        if key in _PROVIDER_JSON_COLS and not isinstance(value, (str, bytes)):
+            value = _pack(value)
+        values.append(value)
+    return values
 
 
 def update_provider(provider_id: int, updates: Dict[str, Any]) -> bool:
@@ -190,62 +439,60 @@ def update_provider(provider_id: int, updates: Dict[str, Any]) -> bool:
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # Build update query dynamically
-        update_fields = []
-        values = []
-        
-        for key, value in updates.items():
-            if key in ['raw_data', 'validated_data', 'enriched_data']:
-                value = json.dumps(value) if isinstance(value, dict) else value
-            update_fields.append(f"{key} = ?")
-            values.append(value)
-        
-        # Always update updated_at
-        update_fields.append("updated_at = ?")
-        values.append(datetime.now().isoformat())
-        values.append(provider_id)
-        
-        query = f"UPDATE providers SET {', '.join(update_fields)} WHERE id = ?"
-        cursor.execute(query, values)
-        conn.commit()
+        # Sorted so every call with the same columns reuses one SQL string
+        cols = tuple(sorted(updates))
+        cursor.execute(_update_sql(cols), _update_values(cols, updates) + [provider_id])
         
         return cursor.rowcount > 0
 
 
 def update_provider_after_validation(provider_id: int, updated_dict: Dict[str, Any]) -> bool:
-    from datetime import datetime
-    import json
-
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    """Store pipeline results for a provider; same as update_provider."""
+    return update_provider(provider_id, updated_dict)
 
-        update_fields = []
-        values = []
 
-        for key, value in updated_dict.items():
-            # Serialize JSON fields properly
-            if key in ["validated_data", "enriched_data", "raw_data"]:
-                value = json.dumps(value)
+def bulk_update_providers(updates: List[Tuple[int, Dict[str, Any]]]) -> None:
+    """
+    Apply many provider updates in one transaction.
+    
+    Args:
+        updates: (provider_id, fields) pairs, fields as for update_provider.
+            Updates sharing a column set go through a single executemany.
+    """
+    grouped: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for provider_id, fields in updates:
+        cols = tuple(sorted(fields))
+        grouped.setdefault(cols, []).append(_update_values(cols, fields) + [provider_id])
+    
+    with get_db_connection() as conn:
+        for cols, rows in grouped.items():
+            conn.executemany(_update_sql(cols), rows)
 
-            update_fields.append(f"{key} = ?")
-            values.append(value)
 
-        update_fields.append("updated_at = ?")
-        values.append(datetime.now().isoformat())
 
-        values.append(provider_id)
+_REFRESH_CACHED_DISCREPANCIES_SQL = f"""
+    UPDATE providers SET cached_discrepancies = (
+        {_CACHED_DISCREPANCIES_SQL.format(provider_id="providers.id")}
+    )
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
 
-        query = f"""
-            UPDATE providers
-            SET {", ".join(update_fields)}
-            WHERE id = ?
-        """
 
-        cursor.execute(query, values)
-        conn.commit()
+def _refresh_cached_discrepancies(conn: sqlite3.Connection, provider_ids: Iterable[Any]) -> None:
+    """Rebuild cached_discrepancies once for each of the given providers."""
+    ids = sorted({pid for pid in provider_ids if pid is not None})
+    if ids:
+        conn.execute(_REFRESH_CACHED_DISCREPANCIES_SQL, (_dumps(ids),))
 
-        return cursor.rowcount > 0
 
+_INSERT_DISCREPANCY_SQL = """
+    INSERT INTO discrepancies (
+        provider_id, field_name, csv_value, api_value,
+        scraped_value, final_value, confidence, risk_level,
+        status, notes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+"""
 
 
 def insert_discrepancy(discrepancy_data: Dict[str, Any]) -> int:
@@ -261,13 +508,7 @@ def insert_discrepancy(discrepancy_data: Dict[str, Any]) -> int:
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO discrepancies (
-                provider_id, field_name, csv_value, api_value,
-                scraped_value, final_value, confidence, risk_level,
-                status, notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(_INSERT_DISCREPANCY_SQL, (
             discrepancy_data.get('provider_id'),
             discrepancy_data.get('field_name'),
             discrepancy_data.get('csv_value'),
@@ -279,9 +520,71 @@ def insert_discrepancy(discrepancy_data: Dict[str, Any]) -> int:
             discrepancy_data.get('status', 'open'),
             discrepancy_data.get('notes')
         ))
-        conn.commit()
+        discrepancy_id = cursor.fetchone()[0]
+        _refresh_cached_discrepancies(conn, (discrepancy_data.get('provider_id'),))
         
-        return cursor.lastrowid
+        return discrepancy_id
+
+
+def _discrepancy_row(discrepancy_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Discrepancy columns with the same defaults insert_discrepancy applies."""
+    return {
+        'provider_id': discrepancy_data.get('provider_id'),
+        'field_name': discrepancy_data.get('field_name'),
+        'csv_value': discrepancy_data.get('csv_value'),
+        'api_value': discrepancy_data.get('api_value'),
+        'scraped_value': discrepancy_data.get('scraped_value'),
+        'final_value': discrepancy_data.get('final_value'),
+        'confidence': discrepancy_data.get('confidence', 0),
+        'risk_level': discrepancy_data.get('risk_level', 'medium'),
+        'status': discrepancy_data.get('status', 'open'),
+        'notes': discrepancy_data.get('notes')
+    }
+
+
+def insert_discrepancies_bulk(discrepancies: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert many discrepancy records with a single statement.
+    
+    The rows are passed as one JSON array and expanded by json_each, so the
+    batch size is not bounded by SQLite's bind-parameter limit.
+    
+    Args:
+        discrepancies: List of discrepancy dictionaries (same shape as insert_discrepancy)
+        
+    Returns:
+        IDs of the inserted discrepancies
+    """
+    if not discrepancies:
+        return []
+    
+    rows = [_discrepancy_row(d) for d in discrepancies]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO discrepancies (
+                provider_id, field_name, csv_value, api_value,
+                scraped_value, final_value, confidence, risk_level,
+                status, notes
+            )
+            SELECT
+                json_extract(value, '$.provider_id'),
+                json_extract(value, '$.field_name'),
+                json_extract(value, '$.csv_value'),
+                json_extract(value, '$.api_value'),
+                json_extract(value, '$.scraped_value'),
+                json_extract(value, '$.final_value'),
+                json_extract(value, '$.confidence'),
+                json_extract(value, '$.risk_level'),
+                json_extract(value, '$.status'),
+                json_extract(value, '$.notes')
+            FROM json_each(?)
+            RETURNING id
+        """, (_dumps(rows),))
+        # RETURNING order is unspecified; AUTOINCREMENT ids follow input order
+        ids = sorted(row[0] for row in cursor.fetchall())
+        _refresh_cached_discrepancies(conn, (row['provider_id'] for row in rows))
+        return ids
 
 
 def insert_discrepancy_simple(provider_id: int, field: str, old_value: str, new_value: str) -> int:
@@ -311,11 +614,72 @@ def insert_discrepancy_simple(provider_id: int, field: str, old_value: str, new_
     })
 
 
+_INSERT_LOG_SQL = """
+    INSERT INTO logs (event_type, provider_id, agent_name, message, metadata)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+# log_event only enqueues; a background thread writes the rows in batches
+LOG_BATCH_SIZE = 512
+LOG_FLUSH_INTERVAL = 0.05  # seconds
+_LOG_QUEUE: "queue.SimpleQueue" = queue.SimpleQueue()
+
+
+def _write_log_batch(batch: List[tuple]) -> None:
+    if not batch:
+        return
+    try:
+        with get_db_connection() as conn:
+            conn.executemany(_INSERT_LOG_SQL, batch)
+    except Exception:
+        logger.exception("Failed to write %d log events", len(batch))
+
+
+def _log_writer() -> None:
+    """Drain _LOG_QUEUE forever: up to LOG_BATCH_SIZE rows or LOG_FLUSH_INTERVAL per batch."""
+    while True:
+        batch: List[tuple] = []
+        item = _LOG_QUEUE.get()
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while True:
+            if isinstance(item, threading.Event):
+                # flush_logs() marker: everything queued before it is in batch
+                _write_log_batch(batch)
+                batch = []
+                item.set()
+            else:
+                batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= LOG_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _LOG_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+        _write_log_batch(batch)
+
+
+def flush_logs(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Block until every log event queued so far has been written.
+    
+    Returns:
+        False if the writer did not catch up within timeout
+    """
+    done = threading.Event()
+    _LOG_QUEUE.put(done)
+    return done.wait(timeout)
+
+
 def log_event(event_type: str, message: str, agent_name: Optional[str] = None,
               provider_id: Optional[int] = None, metadata: Optional[Dict] = None):
     """
     Log an event to the logs table.
     
+    The row is queued and written by a background thread shortly after;
+    call flush_logs() to wait for it.
+    
     Args:
         event_type: Type of event (e.g., 'validation', 'enrichment', 'error')
         message: Log message
@@ -323,81 +687,194 @@ def log_event(event_type: str, message: str, agent_name: Optional[str] = None,
         provider_id: Optional provider ID
         metadata: Optional metadata dictionary
     """
+    metadata_json = _dumps(metadata) if metadata else None
+    _LOG_QUEUE.put((event_type, provider_id, agent_name, message, metadata_json))
+
+
+def log_events_bulk(events: List[Dict[str, Any]]) -> None:
+    """
+    Log many events with a single statement.
+    
+    Args:
+        events: List of dicts with event_type, message and optional
+            agent_name, provider_id, metadata (same as log_event's arguments)
+    """
+    if not events:
+        return
+    
+    rows = [
+        {
+            'event_type': event.get('event_type'),
+            'provider_id': event.get('provider_id'),
+            'agent_name': event.get('agent_name'),
+            'message': event.get('message'),
+            'metadata': _dumps(event['metadata']) if event.get('metadata') else None
+        }
+        for event in events
+    ]
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        metadata_json = json.dumps(metadata) if metadata else None
-        
         cursor.execute("""
             INSERT INTO logs (event_type, provider_id, agent_name, message, metadata)
-            VALUES (?, ?, ?, ?, ?)
-        """, (event_type, provider_id, agent_name, message, metadata_json))
+            SELECT
+                json_extract(value, '$.event_type'),
+                json_extract(value, '$.provider_id'),
+                json_extract(value, '$.agent_name'),
+                json_extract(value, '$.message'),
+                json_extract(value, '$.metadata')
+            FROM json_each(?)
+        """, (_dumps(rows),))
+
+
+def _provider_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a providers row to a dict, decoding the JSON columns."""
+    provider_dict = dict(row)
+    for key in _PROVIDER_JSON_COLS:
+        if provider_dict.get(key):
+            try:
+                provider_dict[key] = _unpack(provider_dict[key])
+            except Exception:
+                pass
+    return provider_dict
 
 
 def get_provider(provider_id: int) -> Optional[Dict[str, Any]]:
     """Get a provider by ID."""
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM providers WHERE id = ?", (provider_id,))
         row = cursor.fetchone()
         if row:
-            return dict(row)
+            return _provider_from_row(row)
         return None
 
 
+def get_provider_scalar(provider_id: int) -> Optional[Dict[str, Any]]:
+    """Get a provider by ID without the JSON blob columns."""
+    with get_read_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(_PROVIDER_SCALAR_COLUMNS)} FROM providers WHERE id = ?",
+            (provider_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def get_provider_blob(provider_id: int, field: str) -> Any:
+    """
+    Get one decoded JSON column (raw_data, validated_data or enriched_data) of a provider.
+    
+    Returns:
+        The decoded value, or None if the provider or value is missing
+    """
+    if field not in _PROVIDER_JSON_COLS:
+        raise ValueError(f"Not a provider JSON column: {field}")
+    with get_read_connection() as conn:
+        row = conn.execute(f"SELECT {field} FROM providers WHERE id = ?", (provider_id,)).fetchone()
+    if not row or not row[0]:
+        return None
+    return _unpack(row[0])
+
+
 def get_provider_by_npi(npi: str) -> Optional[Dict[str, Any]]:
     """Get a provider by NPI."""
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM providers WHERE npi = ?", (npi,))
         row = cursor.fetchone()
         if row:
-            return dict(row)
+            return _provider_from_row(row)
         return None
 
 
-def get_all_providers(limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+def iter_provider_ids(limit: Optional[int] = None) -> Iterator[int]:
     """
-    Get all providers with pagination.
+    Yield provider IDs, newest first, without loading any other columns.
+    
+    Args:
+        limit: Maximum number of IDs; None for all providers
+    """
+    with get_read_connection() as conn:
+        rows = conn.execute(
+            "SELECT id FROM providers ORDER BY created_at DESC, id DESC LIMIT ?",
+            (-1 if limit is None else limit,)
+        ).fetchall()
+    for row in rows:
+        yield row[0]
+
+
+def get_all_providers(limit: int = 100,
+                      after: Optional[Tuple[str, int]] = None,
+                      include_json: bool = True) -> List[Dict[str, Any]]:
+    """
+    Get all providers with keyset pagination, newest first.
     
     Args:
         limit: Maximum number of providers to return
-        offset: Number of providers to skip
+        after: (created_at, id) of the last provider on the previous page;
+            None for the first page
+        include_json: Also read and decode the JSON blob columns; pass False
+            when only the scalar fields are needed
         
     Returns:
         List of provider dictionaries
     """
-    with get_db_connection() as conn:
+    columns = "*" if include_json else ", ".join(_PROVIDER_SCALAR_COLUMNS)
+    with get_read_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM providers ORDER BY created_at DESC LIMIT ? OFFSET ?", 
-                      (limit, offset))
-        rows = cursor.fetchall()
-        result = []
-        for row in rows:
-            provider_dict = dict(row)
-            # Parse JSON fields
-            if provider_dict.get('raw_data'):
-                try:
-                    provider_dict['raw_data'] = json.loads(provider_dict['raw_data'])
-                except:
-                    pass
-            if provider_dict.get('validated_data'):
-                try:
-                    provider_dict['validated_data'] = json.loads(provider_dict['validated_data'])
-                except:
-                    pass
-            if provider_dict.get('enriched_data'):
-                try:
-                    provider_dict['enriched_data'] = json.loads(provider_dict['enriched_data'])
-                except:
-                    pass
-            result.append(provider_dict)
-        return result
+        if after is None:
+            cursor.execute(f"SELECT {columns} FROM providers ORDER BY created_at DESC, id DESC LIMIT ?",
+                           (limit,))
+        else:
+            cursor.execute(f"""
+                SELECT {columns} FROM providers
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (*after, limit))
+        return [_provider_from_row(row) for row in cursor.fetchall()]
+
+
+async def iter_providers(limit: Optional[int] = None, batch_size: int = 500,
+                         after: Optional[Tuple[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream providers newest first, one keyset page at a time.
+    
+    At most two pages are held in memory: while callers work through one,
+    the next is already being fetched in a worker thread. Pages are read
+    through get_read_connection, so fetching never holds the write lock.
+    
+    Args:
+        limit: Maximum number of providers; None for all
+        batch_size: Providers fetched per query
+        after: (created_at, id) to start after, as for get_all_providers
+    """
+    def fetch(count: int, start: Optional[Tuple[str, int]]):
+        return asyncio.ensure_future(asyncio.to_thread(get_all_providers, limit=count, after=start))
+    
+    remaining = limit
+    page_size = batch_size if remaining is None else min(batch_size, remaining)
+    pending = fetch(page_size, after) if page_size > 0 else None
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+            if remaining is not None:
+                remaining -= len(page)
+            # Start the next page before handing out this one
+            if len(page) == page_size and (remaining is None or remaining > 0):
+                page_size = batch_size if remaining is None else min(batch_size, remaining)
+                pending = fetch(page_size, (page[-1]["created_at"], page[-1]["id"]))
+            for provider in page:
+                yield provider
+    finally:
+        if pending is not None:
+            pending.cancel()
 
 
 def get_discrepancies(provider_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
     """Get discrepancies, optionally filtered by provider_id or status."""
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
         
         query = "SELECT * FROM discrepancies WHERE 1=1"
@@ -411,12 +888,41 @@ def get_discrepancies(provider_id: Optional[int] = None, status: Optional[str] =
             query += " AND status = ?"
             params.append(status)
         
-        query += " ORDER BY created_at DESC"
+        # id breaks created_at ties, matching cached_discrepancies
+        query += " ORDER BY created_at DESC, id DESC"
         
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
+def get_summary_stats() -> Dict[str, Any]:
+    """
+    Aggregate provider and discrepancy counts for the dashboard.
+    
+    Computed with SQL aggregates so no provider rows are loaded into Python.
+    """
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT
+                COUNT(*) AS total_providers,
+                COALESCE(SUM(validation_status = 'validated'), 0) AS validated_providers,
+                COALESCE(SUM(validation_status = 'pending'), 0) AS pending_providers,
+                COALESCE(AVG(COALESCE(confidence_score, 0)), 0) AS avg_confidence_score,
+                COALESCE(SUM(risk_score >= 70), 0) AS high_risk_providers
+            FROM providers
+        """)
+        stats = dict(cursor.fetchone())
+        cursor.execute("""
+            SELECT
+                COUNT(*) AS total_discrepancies,
+                COALESCE(SUM(status = 'open'), 0) AS open_discrepancies
+            FROM discrepancies
+        """)
+        stats.update(dict(cursor.fetchone()))
+        return stats
+
+
 def get_validation_status() -> Dict[str, Any]:
     """
     Get current validation status.
@@ -432,21 +938,14 @@ def get_validation_status() -> Dict[str, Any]:
             "error_message": str or None
         }
     """
-    with get_db_connection() as conn:
+    with get_read_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM validation_status ORDER BY created_at DESC LIMIT 1")
+        cursor.execute("SELECT * FROM validation_status WHERE id = 1")
         row = cursor.fetchone()
         
         if row:
             return dict(row)
         else:
-            # Initialize if doesn't exist
-            cursor.execute("""
-                INSERT INTO validation_status 
-                (status, last_run_time, last_completion_time) 
-                VALUES ('idle', NULL, NULL)
-            """)
-            conn.commit()
             return {
                 "status": "idle",
                 "last_run_time": None,
@@ -468,9 +967,8 @@ def set_validation_status_running() -> None:
                 last_run_time = CURRENT_TIMESTAMP,
                 error_message = NULL,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT MAX(id) FROM validation_status)
+            WHERE id = 1
         """)
-        conn.commit()
 
 
 def set_validation_status_completed(validated_count: int, needs_review_count: int, 
@@ -487,9 +985,8 @@ def set_validation_status_completed(validated_count: int, needs_review_count: in
                 needs_review_count = ?,
                 error_message = ?,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT MAX(id) FROM validation_status)
+            WHERE id = 1
         """, (total_providers, validated_count, needs_review_count, error_message))
-        conn.commit()
 
 
 def set_validation_status_failed(error_message: str) -> None:
@@ -501,11 +998,44 @@ def set_validation_status_failed(error_message: str) -> None:
             SET status = 'failed', 
                 error_message = ?,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT MAX(id) FROM validation_status)
+            WHERE id = 1
         """, (error_message,))
-        conn.commit()
+
+
+
+# Seconds an OCR result stays reusable
+OCR_CACHE_TTL = 86400
+
+
+def get_cached_ocr_result(content_hash: str) -> Optional[Dict[str, Any]]:
+    """Get a cached OCR result for a PDF hash, or None if missing or expired."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT result FROM ocr_cache
+            WHERE content_hash = ? AND created_at > datetime('now', ?)
+        """, (content_hash, f"-{OCR_CACHE_TTL} seconds"))
+        row = cursor.fetchone()
+        if row:
+            return _loads(row["result"])
+        return None
+
+
+def cache_ocr_result(content_hash: str, result: Dict[str, Any]) -> None:
+    """Store an OCR result for a PDF hash and drop expired entries."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO ocr_cache (content_hash, result, created_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (content_hash, _dumps(result)))
+        cursor.execute("DELETE FROM ocr_cache WHERE created_at <= datetime('now', ?)",
+                       (f"-{OCR_CACHE_TTL} seconds",))
 
 
 # Initialize database on import
 init_database()
 
+threading.Thread(target=_log_writer, name="medatlas-log-writer", daemon=True).start()
+atexit.register(flush_logs)
+
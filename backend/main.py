@@ -3,15 +3,14 @@ Pipeline Orchestrator for MedAtlas.
 Runs the 4-agent AI pipeline for provider data validation and enrichment.
 """
 
-import sys
-from pathlib import Path
-# Add project root to path
-project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
-
 import asyncio
+import csv
+import hashlib
+import importlib.util
+import json
 import logging
-import pandas as pd
+import os
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 from backend.agents import (
     DataValidationAgent,
@@ -20,15 +19,93 @@ from backend.agents import (
     DirectoryManagementAgent
 )
 from backend.database import (
-    get_all_providers,
-    get_provider,
-    insert_provider,
+    get_provider_scalar,
+    iter_provider_ids,
+    insert_providers_bulk,
     log_event
 )
+from backend.models import ProviderBase
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Provider column -> CSV header
+CSV_COLUMNS = {
+    "npi": "NPI",
+    "first_name": "First Name",
+    "last_name": "Last Name",
+    "organization_name": "Organization Name",
+    "provider_type": "Provider Type",
+    "specialty": "Specialty",
+    "address_line1": "Address Line 1",
+    "address_line2": "Address Line 2",
+    "city": "City",
+    "state": "State",
+    "zip_code": "ZIP Code",
+    "phone": "Phone",
+    "email": "Email",
+    "website": "Website",
+    "license_number": "License Number",
+    "license_state": "License State",
+    "practice_name": "Practice Name",
+}
+
+
+# Provider input fields that determine a pipeline result
+_SIGNATURE_FIELDS = tuple(ProviderBase.model_fields.keys())
+
+# Parse uploads with the Arrow CSV reader when pyarrow is installed (optional)
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Max pipeline results kept by PipelineOrchestrator
+RESULT_CACHE_SIZE = 1024
+
+# Max providers running through the agents at once
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "32"))
+
+# Max providers inside each agent stage at once. A provider holds one stage
+# slot at a time, so later stages work on earlier providers while the first
+# stage takes new ones, and the slowest stage sets the throughput.
+STAGE_CONCURRENCY = {
+    "validation": 16,  # NPI registry lookups
+    "enrichment": 8,   # scraping / OCR
+    "qa": 4,           # discrepancy + provider writes to SQLite
+    "finalize": 16,    # in-memory merge
+}
+
+
+def _provider_signature(provider: Dict[str, Any], pdf_path: Optional[str] = None) -> str:
+    """Hash the provider's input fields so unchanged providers can reuse a cached result."""
+    payload = {k: provider.get(k) for k in _SIGNATURE_FIELDS}
+    payload["pdf_path"] = pdf_path
+    return hashlib.blake2b(
+        json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+
+
+def _read_csv_arrow(csv_path: str):
+    """
+    Read a CSV into Arrow-backed string columns with pyarrow's parser.
+    
+    pandas' engine="pyarrow" infers types first and casts afterwards, which
+    drops leading zeros from NPIs/ZIP codes, so every column is declared as
+    a string up front instead.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f), [])
+    table = pacsv.read_csv(
+        csv_path,
+        convert_options=pacsv.ConvertOptions(
+            column_types=dict.fromkeys(header, pa.string()),
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
 
 class PipelineOrchestrator:
     """Orchestrates the 4-agent pipeline."""
@@ -38,57 +115,98 @@ class PipelineOrchestrator:
         self.enrichment_agent = EnrichmentAgent()
         self.qa_agent = QAAgent()
         self.directory_agent = DirectoryManagementAgent()
+        # (provider_id, signature) -> result, least recently used first
+        self._result_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        # Agents are I/O-bound; let several providers overlap their network waits
+        self._sem = asyncio.Semaphore(PIPELINE_CONCURRENCY)
+        self._stage_sems = {
+            stage: asyncio.Semaphore(limit) for stage, limit in STAGE_CONCURRENCY.items()
+        }
     
-    async def process_provider(self, provider_id: int, pdf_path: Optional[str] = None) -> Dict[str, Any]:
+    async def process_provider(self, provider_id: int, pdf_path: Optional[str] = None,
+                               force_revalidate: bool = False, *,
+                               provider: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process a single provider through the pipeline.
         
+        Results are cached per provider and input signature, so an unchanged
+        provider is not re-run unless force_revalidate is set. Failed runs
+        raise and are never cached.
+        
         Args:
             provider_id: Provider ID
             pdf_path: Optional path to PDF file
+            force_revalidate: Skip the result cache and re-run the pipeline
+            provider: Provider data the caller already holds (e.g. a row it
+                just inserted); skips reading the row back from the database
             
         Returns:
             Final processing results
         """
-        logger.info(f"Processing provider {provider_id}")
+        logger.info("Processing provider %s", provider_id)
+        
+        # Get provider data; the agents only need the scalar columns
+        if provider is None:
+            provider = get_provider_scalar(provider_id)
+            if not provider:
+                raise ValueError(f"Provider {provider_id} not found")
+        # Denormalized read cache, not provider data; keep it out of agent output
+        provider.pop("cached_discrepancies", None)
+        
+        cache_key = (provider_id, _provider_signature(provider, pdf_path))
+        if not force_revalidate and cache_key in self._result_cache:
+            self._result_cache.move_to_end(cache_key)
+            logger.info("Using cached pipeline result for provider %s", provider_id)
+            return self._result_cache[cache_key]
+        
+        async with self._sem:
+            result = await self._run_agents(provider_id, provider, pdf_path)
         
-        # Get provider data
-        provider = get_provider(provider_id)
-        if not provider:
-            raise ValueError(f"Provider {provider_id} not found")
+        self._result_cache[cache_key] = result
+        self._result_cache.move_to_end(cache_key)
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
         
+        return result
+    
+    async def _run_agents(self, provider_id: int, provider: Dict[str, Any],
+                          pdf_path: Optional[str]) -> Dict[str, Any]:
+        """Run the four agents for one provider."""
         # Step 1: Data Validation Agent
-        logger.info(f"Step 1: Validating provider {provider_id}")
-        validation_results = await self.validation_agent.validate_provider(provider)
+        logger.info("Step 1: Validating provider %s", provider_id)
+        async with self._stage_sems["validation"]:
+            validation_results = await self.validation_agent.validate_provider(provider)
         validated_data = validation_results.get("validated_data", provider.copy())
         
         # Step 2: Enrichment Agent
-        logger.info(f"Step 2: Enriching provider {provider_id}")
-        enriched_data = await self.enrichment_agent.enrich_provider(
-            validated_data,
-            pdf_path=pdf_path
-        )
+        logger.info("Step 2: Enriching provider %s", provider_id)
+        async with self._stage_sems["enrichment"]:
+            enriched_data = await self.enrichment_agent.enrich_provider(
+                validated_data,
+                pdf_path=pdf_path
+            )
         
         # Step 3: QA Agent
-        logger.info(f"Step 3: QA analysis for provider {provider_id}")
-        qa_results = await self.qa_agent.analyze_provider(
-            csv_data=provider,
-            validated_data=validated_data,
-            enriched_data=enriched_data
-        )
+        logger.info("Step 3: QA analysis for provider %s", provider_id)
+        async with self._stage_sems["qa"]:
+            qa_results = await self.qa_agent.analyze_provider(
+                csv_data=provider,
+                validated_data=validated_data,
+                enriched_data=enriched_data
+            )
         
         # Step 4: Directory Management Agent
-        logger.info(f"Step 4: Finalizing provider {provider_id}")
-        final_results = await self.directory_agent.finalize_provider(
-            provider_id=provider_id,
-            validated_data=validated_data,
-            enriched_data=enriched_data,
-            qa_results=qa_results
-        )
+        logger.info("Step 4: Finalizing provider %s", provider_id)
+        async with self._stage_sems["finalize"]:
+            final_results = await self.directory_agent.finalize_provider(
+                provider_id=provider_id,
+                validated_data=validated_data,
+                enriched_data=enriched_data,
+                qa_results=qa_results
+            )
         
-        logger.info(f"Completed processing provider {provider_id}. "
-                   f"Confidence: {final_results['confidence_score']}, "
-                   f"Risk: {final_results['risk_score']}")
+        logger.info("Completed processing provider %s. Confidence: %s, Risk: %s",
+                    provider_id, final_results['confidence_score'], final_results['risk_score'])
         
         return {
             "provider_id": provider_id,
@@ -98,6 +216,18 @@ class PipelineOrchestrator:
             "final_results": final_results
         }
     
+    async def _safe_process(self, provider_id: int, pdf_path: Optional[str] = None,
+                            provider: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """process_provider, with failures returned as an error entry instead of raised."""
+        try:
+            return await self.process_provider(provider_id, pdf_path=pdf_path, provider=provider)
+        except Exception as e:
+            logger.error("Error processing provider %s: %s", provider_id, e)
+            return {
+                "provider_id": provider_id,
+                "error": str(e)
+            }
+    
     async def process_all_providers(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Process all providers through the pipeline.
@@ -108,24 +238,15 @@ class PipelineOrchestrator:
         Returns:
             List of processing results
         """
-        providers = get_all_providers(limit=limit or 1000)
-        results = []
-        
-        logger.info(f"Processing {len(providers)} providers")
-        
-        # Process providers sequentially (can be parallelized if needed)
-        for provider in providers:
-            try:
-                result = await self.process_provider(provider["id"])
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error processing provider {provider['id']}: {e}")
-                results.append({
-                    "provider_id": provider["id"],
-                    "error": str(e)
-                })
-        
-        return results
+        # Only the ids are needed here; process_provider loads each row itself
+        provider_ids = list(iter_provider_ids(limit=limit or 1000))
+        
+        logger.info("Processing %s providers", len(provider_ids))
+        
+        # Run concurrently (bounded by the semaphore); gather keeps input order
+        return list(await asyncio.gather(
+            *(self._safe_process(provider_id) for provider_id in provider_ids)
+        ))
     
     async def process_from_csv(self, csv_path: str, pdf_paths: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """
@@ -138,61 +259,59 @@ class PipelineOrchestrator:
         Returns:
             List of processing results
         """
-        # Load CSV
-        df = pd.read_csv(csv_path)
-        
-        results = []
-        
-        for _, row in df.iterrows():
-            # Create provider data
-            provider_data = {
-                "npi": str(row.get("NPI", "")).strip() if pd.notna(row.get("NPI")) else None,
-                "first_name": str(row.get("First Name", "")).strip() if pd.notna(row.get("First Name")) else None,
-                "last_name": str(row.get("Last Name", "")).strip() if pd.notna(row.get("Last Name")) else None,
-                "organization_name": str(row.get("Organization Name", "")).strip() if pd.notna(row.get("Organization Name")) else None,
-                "provider_type": str(row.get("Provider Type", "")).strip() if pd.notna(row.get("Provider Type")) else None,
-                "specialty": str(row.get("Specialty", "")).strip() if pd.notna(row.get("Specialty")) else None,
-                "address_line1": str(row.get("Address Line 1", "")).strip() if pd.notna(row.get("Address Line 1")) else None,
-                "address_line2": str(row.get("Address Line 2", "")).strip() if pd.notna(row.get("Address Line 2")) else None,
-                "city": str(row.get("City", "")).strip() if pd.notna(row.get("City")) else None,
-                "state": str(row.get("State", "")).strip() if pd.notna(row.get("State")) else None,
-                "zip_code": str(row.get("ZIP Code", "")).strip() if pd.notna(row.get("ZIP Code")) else None,
-                "phone": str(row.get("Phone", "")).strip() if pd.notna(row.get("Phone")) else None,
-                "email": str(row.get("Email", "")).strip() if pd.notna(row.get("Email")) else None,
-                "website": str(row.get("Website", "")).strip() if pd.notna(row.get("Website")) else None,
-                "license_number": str(row.get("License Number", "")).strip() if pd.notna(row.get("License Number")) else None,
-                "license_state": str(row.get("License State", "")).strip() if pd.notna(row.get("License State")) else None,
-                "practice_name": str(row.get("Practice Name", "")).strip() if pd.notna(row.get("Practice Name")) else None,
-                "source_file": csv_path,
-                "raw_data": row.to_dict()
-            }
-            
-            # Insert provider
-            provider_id = insert_provider(provider_data)
-            
+        # pandas is only needed on the upload path; keep it off app startup
+        import pandas as pd
+
+        # Load CSV as text so IDs and ZIP codes keep their exact digits
+        if _HAS_PYARROW:
+            df = _read_csv_arrow(csv_path)
+            string_dtype = "string[pyarrow]"
+        else:
+            df = pd.read_csv(csv_path, dtype=str)
+            string_dtype = "string"
+        # One JSON line per row straight from the frame, stored as raw_data.
+        # Keep force_ascii (escapes U+2028, \x85, ...) and split on "\n" only:
+        # splitlines() also breaks on those characters and misaligns rows.
+        # Every record is at least "{}", so empty pieces are just the trailing newline.
+        raw_json = [line for line in df.to_json(orient="records", lines=True).split("\n") if line]
+        
+        # Select + rename the known columns (missing ones become empty) and
+        # strip the whole frame at once instead of cell-by-cell
+        clean = (
+            df.reindex(columns=list(CSV_COLUMNS.values()))
+            .rename(columns={header: field for field, header in CSV_COLUMNS.items()})
+            .astype(string_dtype)
+            .apply(lambda col: col.str.strip())
+        )
+        providers = clean.astype(object).where(clean.notna(), None).to_dict("records")
+        for provider_data in providers:
+            provider_data["source_file"] = csv_path
+        
+        # Insert all rows in one transaction
+        provider_ids = insert_providers_bulk(providers, raw_data_json=raw_json)
+        
+        tasks = []
+        for provider_id, provider_data in zip(provider_ids, providers):
             # Get PDF path if available
             pdf_path = None
             if pdf_paths and provider_data["npi"]:
                 pdf_path = pdf_paths.get(provider_data["npi"])
             
-            # Process through pipeline
-            try:
-                result = await self.process_provider(provider_id, pdf_path=pdf_path)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error processing provider {provider_id}: {e}")
-                results.append({
-                    "provider_id": provider_id,
-                    "error": str(e)
-                })
+            # The row was just written from provider_data; don't read it back
+            tasks.append(self._safe_process(
+                provider_id, pdf_path=pdf_path, provider={"id": provider_id, **provider_data}
+            ))
         
-        return results
+        # Process through pipeline concurrently, results in CSV order
+        return list(await asyncio.gather(*tasks))
+
+
+# Shared by the API routers so they use one set of agents and one result cache
+orchestrator = PipelineOrchestrator()
 
 
 async def main():
     """Main entry point for pipeline."""
-    orchestrator = PipelineOrchestrator()
-    
     # Example: Process all providers
     # results = await orchestrator.process_all_providers(limit=10)
     
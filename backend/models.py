@@ -5,7 +5,7 @@ Pydantic models for MedAtlas API.
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 
-from pydantic import BaseModel, EmailStr, Field, ValidationError
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, ValidationError
 
 
 class ProviderBase(BaseModel):
@@ -48,8 +48,7 @@ class Provider(ProviderBase):
     validated_data: Optional[Dict[str, Any]] = None
     enriched_data: Optional[Dict[str, Any]] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DiscrepancyBase(BaseModel):
@@ -77,8 +76,11 @@ class Discrepancy(DiscrepancyBase):
     id: int
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Bound once; validate_python skips model_validate's per-call dispatch
+_DISCREPANCY_VALIDATOR = Discrepancy.__pydantic_validator__
 
 
 def make_discrepancy(data: Dict[str, Any]) -> Discrepancy:
@@ -87,22 +89,23 @@ def make_discrepancy(data: Dict[str, Any]) -> Discrepancy:
     even if DB rows have NULLs or slightly bad types.
     """
     try:
-        return Discrepancy.model_validate(data)
+        return _DISCREPANCY_VALIDATOR.validate_python(data)
     except ValidationError:
-        return Discrepancy.model_construct(
-            id=data.get("id"),
-            created_at=data.get("created_at"),
-            provider_id=data.get("provider_id"),
-            field_name=data.get("field_name"),
-            csv_value=data.get("csv_value"),
-            api_value=data.get("api_value"),
-            scraped_value=data.get("scraped_value"),
-            final_value=data.get("final_value"),
-            confidence=data.get("confidence", 0),
-            risk_level=data.get("risk_level") or "medium",
-            status=data.get("status") or "open",
-            notes=data.get("notes"),
-        )
+        pass
+    return Discrepancy.model_construct(
+        id=data.get("id"),
+        created_at=data.get("created_at"),
+        provider_id=data.get("provider_id"),
+        field_name=data.get("field_name"),
+        csv_value=data.get("csv_value"),
+        api_value=data.get("api_value"),
+        scraped_value=data.get("scraped_value"),
+        final_value=data.get("final_value"),
+        confidence=data.get("confidence", 0),
+        risk_level=data.get("risk_level") or "medium",
+        status=data.get("status") or "open",
+        notes=data.get("notes"),
+    )
 
 
 class DiscrepancyUpdate(BaseModel):
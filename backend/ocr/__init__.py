@@ -2,10 +2,16 @@
 OCR module for MedAtlas.
 """
 
-from .pdf_extractor import extract_text_from_pdf, extract_from_pdf_bytes, parse_provider_data
+from .pdf_extractor import (
+    extract_text_from_pdf,
+    extract_text_from_pdf_parallel,
+    extract_from_pdf_bytes,
+    parse_provider_data,
+)
 
 __all__ = [
     "extract_text_from_pdf",
+    "extract_text_from_pdf_parallel",
     "extract_from_pdf_bytes",
     "parse_provider_data"
 ]
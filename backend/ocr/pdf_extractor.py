@@ -3,76 +3,343 @@ PDF extraction using OCR (Tesseract) for scanned documents.
 """
 
 import os
+import re
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Executor
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Any, Union
 import pdf2image
 from PIL import Image
 import pytesseract
+import numpy as np
 import io
 
+try:
+    import pdfplumber
+except ImportError:  # optional: without it every PDF goes through OCR
+    pdfplumber = None
+
+try:
+    import re2
+except ImportError:  # optional: without it parse_provider_data uses the re module
+    re2 = None
+
+try:
+    from rapidocr_onnxruntime import RapidOCR
+except ImportError:  # optional: only needed for OCR_BACKEND=rapidocr
+    RapidOCR = None
+
 logger = logging.getLogger(__name__)
 
+# Average embedded characters per page above which a PDF is treated as born-digital
+MIN_TEXT_CHARS_PER_PAGE = 200
+
 # Configure Tesseract path (Windows)
 # For Linux/Mac, this can be removed or set to None
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 if TESSERACT_CMD and os.path.exists(TESSERACT_CMD):
     pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
+# OCR engine: "tesseract" (default) or "rapidocr" (ONNX Runtime, needs
+# rapidocr_onnxruntime; falls back to Tesseract if it is not installed)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "tesseract").lower()
+
+# LSTM engine only, page treated as one uniform block of text
+TESSERACT_CONFIG = os.getenv("TESSERACT_CONFIG", "--oem 1 --psm 6")
+
+# Render resolution for OCR; accuracy on typed documents levels off around here
+DEFAULT_DPI = 200
+
+# auto_dpi: render at the low DPI first and re-render at the high one only
+# when Tesseract's mean word confidence falls below the threshold
+AUTO_DPI_LOW = 150
+AUTO_DPI_HIGH = 300
+AUTO_DPI_MIN_CONFIDENCE = 60
 
-def extract_text_from_pdf(pdf_path: str, dpi: int = 300) -> Dict[str, Any]:
+_USE_RAPIDOCR = OCR_BACKEND == "rapidocr" and RapidOCR is not None
+if OCR_BACKEND == "rapidocr" and RapidOCR is None:
+    logger.warning("OCR_BACKEND=rapidocr but rapidocr_onnxruntime is not installed; using Tesseract")
+
+
+def extract_text_layer(pdf_path: Union[str, IO[bytes]]) -> Optional[List[str]]:
+    """
+    Read the embedded text layer of a born-digital PDF.
+    
+    Args:
+        pdf_path: Path to PDF file, or a binary file object holding one
+        
+    Returns:
+        Text per page, or None if pdfplumber is unavailable or the PDF
+        looks scanned (too little embedded text) and needs OCR
+    """
+    if pdfplumber is None:
+        return None
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            page_texts = [page.extract_text() or "" for page in pdf.pages]
+    except Exception as e:
+        logger.debug("Text layer probe failed, falling back to OCR: %s", e)
+        return None
+    
+    total_chars = sum(len(text.strip()) for text in page_texts)
+    if not page_texts or total_chars <= MIN_TEXT_CHARS_PER_PAGE * len(page_texts):
+        return None
+    return page_texts
+
+
+def _page_entry(page_number: int, text: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the per-page entry of an extraction result."""
+    return {
+        "page_number": page_number,
+        "text": text,
+        "word_count": len(text.split()),
+        "data": data
+    }
+
+
+def _build_result(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble the extraction result from page entries in page order."""
+    full_text = "\n\n".join(page["text"] for page in pages)
+    
+    return {
+        "success": True,
+        "full_text": full_text,
+        "page_count": len(pages),
+        "pages": pages,
+        # Try to extract structured information
+        "structured_data": parse_provider_data(full_text)
+    }
+
+
+def _error_result(error: Exception) -> Dict[str, Any]:
+    logger.error("Error extracting text from PDF: %s", error)
+    return {
+        "success": False,
+        "error": str(error),
+        "full_text": "",
+        "structured_data": {}
+    }
+
+
+_rapidocr_engine = None
+
+
+def _get_rapidocr():
+    """Load the RapidOCR models once per process (workers load their own)."""
+    global _rapidocr_engine
+    if _rapidocr_engine is None:
+        _rapidocr_engine = RapidOCR()
+    return _rapidocr_engine
+
+
+def _ocr_image_rapidocr(image: Image.Image, page_number: int,
+                        include_raw_data: bool = False) -> Dict[str, Any]:
+    """
+    OCR a single rendered page with RapidOCR.
+    
+    Word data mirrors the Tesseract keys used here: one entry per detected
+    text line, with confidence on Tesseract's 0-100 scale.
+    """
+    result, _ = _get_rapidocr()(np.asarray(image.convert("L")))
+    lines = result or []
+    text = "\n".join(line[1] for line in lines)
+    data = None
+    if include_raw_data:
+        data = {
+            "text": [line[1] for line in lines],
+            "conf": [int(float(line[2]) * 100) for line in lines],
+            "box": [line[0] for line in lines],
+        }
+    return _page_entry(page_number, text, data)
+
+
+def _ocr_image(image: Image.Image, page_number: int,
+               include_raw_data: bool = False) -> Dict[str, Any]:
+    """
+    OCR a single rendered page.
+    
+    One Tesseract run writes the plain text and, if include_raw_data is set,
+    the TSV word data too, instead of separate image_to_string and
+    image_to_data runs.
+    """
+    if _USE_RAPIDOCR:
+        return _ocr_image_rapidocr(image, page_number, include_raw_data)
+    
+    tess = pytesseract.pytesseract
+    config = TESSERACT_CONFIG
+    if include_raw_data:
+        config = f"-c tessedit_create_tsv=1 {config}"
+    data = None
+    with tess.save(image) as (output_base, input_filename):
+        tess.run_tesseract(input_filename, output_base, extension='txt', lang='eng', config=config)
+        with open(f"{output_base}.txt", encoding="utf-8") as f:
+            text = f.read()
+        if include_raw_data:
+            with open(f"{output_base}.tsv", encoding="utf-8") as f:
+                data = tess.file_to_dict(f.read(), '\t', -1)
+    return _page_entry(page_number, text, data)
+
+
+def _render_page(pdf_path: str, page_number: int, dpi: int) -> Image.Image:
+    """Render one PDF page in grayscale; Tesseract works on luminance anyway."""
+    return pdf2image.convert_from_path(
+        pdf_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True
+    )[0]
+
+
+def _mean_confidence(data: Dict[str, Any]) -> float:
+    """Mean Tesseract confidence over recognized words (-1 marks non-word rows)."""
+    confs = [conf for conf in data.get("conf", []) if isinstance(conf, int) and conf >= 0]
+    return sum(confs) / len(confs) if confs else 0.0
+
+
+def ocr_page(pdf_path: str, page_number: int, dpi: int = DEFAULT_DPI,
+             include_raw_data: bool = False, auto_dpi: bool = False) -> Dict[str, Any]:
+    """
+    Render and OCR one page of a PDF.
+    
+    Takes a path rather than an image so it can run in a worker process
+    without pickling rendered pages.
+    
+    Args:
+        pdf_path: Path to PDF file
+        page_number: 1-based page number
+        dpi: DPI for image conversion
+        include_raw_data: Also return Tesseract's per-word data (large)
+        auto_dpi: Ignore dpi; try AUTO_DPI_LOW and retry at AUTO_DPI_HIGH if
+            the result's confidence is low (for scanned forms of mixed quality)
+        
+    Returns:
+        Page entry with text, word count and (optionally) Tesseract word data
+    """
+    if not auto_dpi:
+        return _ocr_image(_render_page(pdf_path, page_number, dpi), page_number, include_raw_data)
+    
+    entry = _ocr_image(_render_page(pdf_path, page_number, AUTO_DPI_LOW), page_number, True)
+    if _mean_confidence(entry["data"]) < AUTO_DPI_MIN_CONFIDENCE:
+        entry = _ocr_image(_render_page(pdf_path, page_number, AUTO_DPI_HIGH), page_number, True)
+    if not include_raw_data:
+        entry["data"] = None
+    return entry
+
+
+def extract_text_from_pdf(pdf_path: str, dpi: int = DEFAULT_DPI,
+                          executor: Optional[Executor] = None,
+                          include_raw_data: bool = False,
+                          auto_dpi: bool = False) -> Dict[str, Any]:
     """
     Extract text from PDF using OCR.
     
+    With an executor (e.g. the API's shared OCR_POOL), pages are OCRed in
+    parallel, one ocr_page task per page. Without one they are OCRed in
+    this process, one after another; no pool is started per call.
+    
     Args:
         pdf_path: Path to PDF file
         dpi: DPI for image conversion (higher = better quality but slower)
+        executor: Optional executor (e.g. a shared process pool) for page OCR
+        include_raw_data: Keep Tesseract's per-word data in each page's "data"
+        auto_dpi: Pick the DPI per page from OCR confidence (see ocr_page)
         
     Returns:
         Dictionary with extracted text and metadata
     """
     try:
-        # Convert PDF to images
-        images = pdf2image.convert_from_path(pdf_path, dpi=dpi)
+        # Born-digital PDFs already carry their text; skip rasterizing + OCR
+        page_texts = extract_text_layer(pdf_path)
+        if page_texts is not None:
+            return _build_result([_page_entry(i + 1, text) for i, text in enumerate(page_texts)])
         
-        extracted_text = []
-        page_data = []
+        page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+        page_args = (
+            [pdf_path] * page_count, range(1, page_count + 1),
+            [dpi] * page_count, [include_raw_data] * page_count, [auto_dpi] * page_count,
+        )
+        if executor is not None:
+            pages = executor.map(ocr_page, *page_args)
+        else:
+            pages = map(ocr_page, *page_args)
         
-        for i, image in enumerate(images):
-            # Perform OCR
-            text = pytesseract.image_to_string(image, lang='eng')
-            extracted_text.append(text)
-            
-            # Extract structured data
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            
-            page_data.append({
-                "page_number": i + 1,
-                "text": text,
-                "word_count": len(text.split()),
-                "data": data
-            })
+        # map keeps page order
+        return _build_result(list(pages))
+    
+    except Exception as e:
+        return _error_result(e)
+
+
+async def extract_text_from_pdf_parallel(pdf_path: str, executor: Executor,
+                                         dpi: int = DEFAULT_DPI,
+                                         include_raw_data: bool = False,
+                                         auto_dpi: bool = False) -> Dict[str, Any]:
+    """
+    Extract text from PDF, OCRing pages concurrently on an executor.
+    
+    Same result as extract_text_from_pdf, but each page is rendered and
+    OCRed by its own ocr_page task, so wall time is bounded by the slowest
+    pages rather than the sum of all of them.
+    
+    Args:
+        pdf_path: Path to PDF file
+        executor: Executor to run the probe and page OCR on (a process pool)
+        dpi: DPI for image conversion
+        include_raw_data: Keep Tesseract's per-word data in each page's "data"
+        auto_dpi: Pick the DPI per page from OCR confidence (see ocr_page)
         
-        full_text = "\n\n".join(extracted_text)
+    Returns:
+        Dictionary with extracted text and metadata
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        page_texts = await loop.run_in_executor(executor, extract_text_layer, pdf_path)
+        if page_texts is not None:
+            return _build_result([_page_entry(i + 1, text) for i, text in enumerate(page_texts)])
         
-        # Try to extract structured information
-        structured_data = parse_provider_data(full_text)
+        info = await loop.run_in_executor(executor, pdf2image.pdfinfo_from_path, pdf_path)
+        pages = await asyncio.gather(*[
+            loop.run_in_executor(
+                executor, ocr_page, pdf_path, page_number, dpi, include_raw_data, auto_dpi
+            )
+            for page_number in range(1, info["Pages"] + 1)
+        ])
         
-        return {
-            "success": True,
-            "full_text": full_text,
-            "page_count": len(images),
-            "pages": page_data,
-            "structured_data": structured_data
-        }
+        # gather keeps submission order, so pages are already in page order
+        return _build_result(list(pages))
     
     except Exception as e:
-        logger.error(f"Error extracting text from PDF: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "full_text": "",
-            "structured_data": {}
-        }
+        return _error_result(e)
+
+
+def _compile(pattern: str):
+    """Compile with RE2 (linear-time, no backtracking) when installed, else re."""
+    if re2 is not None:
+        return re2.compile(pattern)
+    return re.compile(pattern)
+
+
+# Field patterns for parse_provider_data, compiled once; flags are inline so
+# they work with both engines
+_NPI_RE = _compile(r'\b\d{10}\b')
+_PHONE_RE = _compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_EMAIL_RE = _compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# Street name limited to 6 tokens and city to 40 chars, so a backtracking
+# engine stays linear on noisy OCR text instead of retrying every split
+_ADDRESS_RE = _compile(
+    r'(?i)\b\d{1,6}\s+(?:[A-Za-z0-9]+[\s,]+){1,6}?(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr)\b'
+    r'[\s,]+[A-Za-z ]{2,40},\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?'
+)
+_NAME_RES = [
+    _compile(r'Dr\.\s+([A-Z][a-z]+\s+[A-Z][a-z]+)'),
+    _compile(r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s*M\.D\.'),
+    _compile(r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s*DO'),
+]
+_LICENSE_RES = [
+    _compile(r'(?i)License[:\s]+([A-Z0-9-]+)'),
+    _compile(r'(?i)License\s+Number[:\s]+([A-Z0-9-]+)'),
+    _compile(r'(?i)Lic\.\s+#[:\s]*([A-Z0-9-]+)'),
+]
+
+# Substrings every match of _NAME_RES needs; pages without one skip those scans
+_NAME_MARKERS = ("Dr.", "M.D.", "DO")
 
 
 def parse_provider_data(text: str) -> Dict[str, Any]:
@@ -85,91 +352,94 @@ def parse_provider_data(text: str) -> Dict[str, Any]:
     Returns:
         Dictionary with parsed provider data
     """
-    import re
-    
     parsed = {}
+    if not text or text.isspace():
+        return parsed
+    
+    # Cheap substring checks let blank pages and cover sheets skip the
+    # regex scans that could not match anyway
+    lowered = text.lower()
     
-    # Extract NPI (10 digits)
-    npi_pattern = r'\b\d{10}\b'
-    npi_matches = re.findall(npi_pattern, text)
-    if npi_matches:
-        # Look for "NPI" label nearby
-        for match in npi_matches:
-            idx = text.find(match)
+    # Extract NPI (10 digits) with an "NPI" label nearby
+    if 'npi' in lowered:
+        for match in _NPI_RE.finditer(text):
+            idx = match.start()
             context = text[max(0, idx-20):idx+30].lower()
             if 'npi' in context:
-                parsed["npi"] = match
+                parsed["npi"] = match.group()
                 break
     
     # Extract phone numbers
-    phone_pattern = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-    phone_matches = re.findall(phone_pattern, text)
-    if phone_matches:
-        parsed["phone"] = phone_matches[0]
+    phone_match = _PHONE_RE.search(text)
+    if phone_match:
+        parsed["phone"] = phone_match.group()
     
     # Extract email
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_matches = re.findall(email_pattern, text)
-    if email_matches:
-        parsed["email"] = email_matches[0]
+    email_match = _EMAIL_RE.search(text) if '@' in text else None
+    if email_match:
+        parsed["email"] = email_match.group()
     
     # Extract addresses
-    address_pattern = r'\d+\s+[A-Za-z0-9\s,]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr)[\s,]+[A-Za-z\s]+,\s*[A-Z]{2}\s+\d{5}'
-    address_matches = re.findall(address_pattern, text, re.IGNORECASE)
-    if address_matches:
-        parsed["address"] = address_matches[0]
+    address_match = _ADDRESS_RE.search(text)
+    if address_match:
+        parsed["address"] = address_match.group()
     
     # Extract names (look for title patterns)
-    name_patterns = [
-        r'Dr\.\s+([A-Z][a-z]+\s+[A-Z][a-z]+)',
-        r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s*M\.D\.',
-        r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s*DO'
-    ]
-    for pattern in name_patterns:
-        matches = re.findall(pattern, text)
-        if matches:
-            parsed["name"] = matches[0]
-            break
+    if any(marker in text for marker in _NAME_MARKERS):
+        for pattern in _NAME_RES:
+            name_match = pattern.search(text)
+            if name_match:
+                parsed["name"] = name_match.group(1)
+                break
     
     # Extract license numbers (varies by state)
-    license_patterns = [
-        r'License[:\s]+([A-Z0-9-]+)',
-        r'License\s+Number[:\s]+([A-Z0-9-]+)',
-        r'Lic\.\s+#[:\s]*([A-Z0-9-]+)'
-    ]
-    for pattern in license_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            parsed["license_number"] = matches[0]
-            break
+    if 'lic' in lowered:
+        for pattern in _LICENSE_RES:
+            license_match = pattern.search(text)
+            if license_match:
+                parsed["license_number"] = license_match.group(1)
+                break
     
     return parsed
 
 
-def extract_from_pdf_bytes(pdf_bytes: bytes, dpi: int = 300) -> Dict[str, Any]:
+def _process_images(images: Iterable[Image.Image], include_raw_data: bool = False) -> List[Dict[str, Any]]:
+    """OCR rendered pages in order; images are consumed one at a time."""
+    return [_ocr_image(image, i + 1, include_raw_data) for i, image in enumerate(images)]
+
+
+def _iter_pages_from_bytes(pdf_bytes: bytes, dpi: int) -> Iterator[Image.Image]:
+    """Render an in-memory PDF page by page, piped to pdftocairo over stdin."""
+    page_count = pdf2image.pdfinfo_from_bytes(pdf_bytes)["Pages"]
+    for page_number in range(1, page_count + 1):
+        yield pdf2image.convert_from_bytes(
+            pdf_bytes, dpi=dpi, first_page=page_number, last_page=page_number,
+            grayscale=True, use_pdftocairo=True
+        )[0]
+
+
+def extract_from_pdf_bytes(pdf_bytes: bytes, dpi: int = DEFAULT_DPI,
+                           include_raw_data: bool = False) -> Dict[str, Any]:
     """
     Extract text from PDF bytes.
     
+    The PDF never touches disk: the text layer is read from a BytesIO and
+    pages are rendered from the bytes directly.
+    
     Args:
         pdf_bytes: PDF file as bytes
         dpi: DPI for image conversion
+        include_raw_data: Keep Tesseract's per-word data in each page's "data"
         
     Returns:
         Dictionary with extracted text and metadata
     """
-    # Save to temporary file
-    import tempfile
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(pdf_bytes)
-        tmp_path = tmp_file.name
-    
     try:
-        result = extract_text_from_pdf(tmp_path, dpi)
-    finally:
-        # Clean up
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+        page_texts = extract_text_layer(io.BytesIO(pdf_bytes))
+        if page_texts is not None:
+            return _build_result([_page_entry(i + 1, text) for i, text in enumerate(page_texts)])
+        
+        return _build_result(_process_images(_iter_pages_from_bytes(pdf_bytes, dpi), include_raw_data))
     
-    return result
-
+    except Exception as e:
+        return _error_result(e)
@@ -3,244 +3,323 @@ Pipeline Runner for MedAtlas.
 Runs the 4-agent validation pipeline for providers.
 """
 
-import sys
-from pathlib import Path
-# Add project root to path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
-
 import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+import os
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from backend.database import (
-    get_all_providers,
-    update_provider_after_validation,
-    insert_discrepancy,
+    iter_providers,
+    get_db_connection,
+    bulk_update_providers,
+    insert_discrepancies_bulk,
+    flush_logs,
     log_event
 )
 from backend.agents import (
     DataValidationAgent,
     EnrichmentAgent,
     QAAgent,
-    DirectoryManagementAgent
+    DirectoryManagementAgent,
+    AgentError
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Agents are stateless, so one instance of each is shared across pipeline runs
+validation_agent = DataValidationAgent()
+enrichment_agent = EnrichmentAgent()
+qa_agent = QAAgent()
+directory_agent = DirectoryManagementAgent()
 
-async def run_validation_pipeline(limit: int = 10000, offset: int = 0) -> Dict[str, Any]:
-# async def run_validation_pipeline(provider_id: int | None = None):
 
-    logger.info("=" * 80)
-    logger.info("STARTING VALIDATION PIPELINE")
-    logger.info("=" * 80)
+# Providers processed at once by run_validation_pipeline; agents mostly wait
+# on I/O, so raise this for network-bound runs
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "32"))
+
+# Log pipeline progress every N completed providers
+PROGRESS_LOG_EVERY = 100
+
+# Provider updates buffered before they are written in one transaction
+WRITE_BATCH_SIZE = 500
+
+_BANNER = "=" * 80
+
+# Merged profile fields written back to the providers table after validation
+_UPDATE_FIELDS = (
+    "phone", "address_line1", "address_line2", "city", "state", "zip_code",
+    "specialty", "website", "email", "first_name", "last_name",
+)
+
+
+# Inputs that decide a validation result; a validated provider whose
+# fingerprint over these is unchanged is skipped on the next run
+_FINGERPRINT_FIELDS = (
+    "npi", "phone", "address_line1", "city", "state", "zip_code",
+    "specialty", "website", "email", "first_name", "last_name",
+)
+
+
+def provider_fingerprint(provider: Dict[str, Any]) -> str:
+    """SHA-256 over a provider's _FINGERPRINT_FIELDS."""
+    values = ("" if provider.get(field) is None else str(provider[field]) for field in _FINGERPRINT_FIELDS)
+    return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def _has_verifiable_inputs(provider: Dict[str, Any]) -> bool:
+    """Whether the agents have anything to check: a phone, street address or website."""
+    return bool(provider.get("phone") or provider.get("address_line1") or provider.get("website"))
+
+
+def _changed_columns(provider: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the columns whose value differs from the stored provider row."""
+    return {k: v for k, v in update.items() if provider.get(k) != v}
+
+
+async def process_provider_record(provider: Dict[str, Any]) -> Tuple[Any, str, Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Run one provider through the four agents.
     
-    # Initialize agents
-    validation_agent = DataValidationAgent()
-    enrichment_agent = EnrichmentAgent()
-    qa_agent = QAAgent()
-    directory_agent = DirectoryManagementAgent()
+    Never raises: failures mark the provider needs_review. Nothing is written
+    to the providers/discrepancies tables here; the caller batches the writes.
+    The provider dict is the only input, so this is the unit of work to hand
+    to another worker or process when scaling the pipeline out.
     
-    # Fetch all providers from database
+    Returns:
+        (provider id, validation status, provider column updates,
+        discrepancies to insert)
+    """
+    provider_id = provider.get("id", "unknown")
     try:
-        providers = get_all_providers(limit=limit, offset=offset)
-        logger.info(f"Fetched {len(providers)} providers to validate")
+        logger.debug("Processing provider ID: %s", provider_id)
+        
+        # ========== STEP 1: DATA VALIDATION AGENT ==========
+        logger.debug("Provider %s: Running DataValidationAgent...", provider_id)
+        validated_result = await validation_agent.validate_provider(provider)
+        
+        validated_data = validated_result.get("validated_data", {})
+        # Extract confidence scores for later use
+        confidence_scores = validated_result.get("confidence_scores", {})
+        
+        # ========== STEP 2: ENRICHMENT AGENT ==========
+        logger.debug("Provider %s: Running EnrichmentAgent...", provider_id)
+        enriched_result = await enrichment_agent.enrich_provider(validated_data)
+        
+        # ========== STEP 3: QA AGENT ==========
+        logger.debug("Provider %s: Running QAAgent...", provider_id)
+        qa_result = await qa_agent.run(
+            original=provider,
+            validated_data=validated_data,
+            enriched_data=enriched_result,
+            confidence_scores=confidence_scores,
+            # The provider update and discrepancies go through the batch writer
+            persist=False
+        )
+        
+        # ========== STEP 4: DIRECTORY MANAGEMENT AGENT ==========
+        logger.debug("Provider %s: Running DirectoryManagementAgent...", provider_id)
+        final_provider = directory_agent.run(
+            provider=provider,
+            validated_result=validated_result,
+            enriched_result=enriched_result,
+            qa_result=qa_result
+        )
+        
+        # ========== STEP 5: PREPARE FINAL RECORD FOR DATABASE ==========
+        confidence_score = qa_result.get("confidence_score", 0)
+        risk_score = qa_result.get("risk_score", 0)
+        discrepancy_count = qa_result.get("discrepancy_count", 0)
+        
+        # Determine validation status based on confidence
+        if confidence_score >= 60:
+            validation_status = "validated"
+        elif confidence_score <= 50:
+            validation_status = "needs_review"
+        else:
+            validation_status = "review_recommended"
+        
+        # Prepare update dict for database: scores plus the merged fields from
+        # the final profile, keeping only columns that actually changed
+        provider_update = _changed_columns(provider, {
+            "validation_status": validation_status,
+            "confidence_score": confidence_score,
+            "risk_score": risk_score,
+            "validated_data": validated_data,
+            "enriched_data": enriched_result,
+            **{field: final_provider.get(field) for field in _UPDATE_FIELDS},
+        })
+        # Fingerprint the row as it will be stored, so the next run can skip it
+        fingerprint = provider_fingerprint({**provider, **provider_update})
+        if fingerprint != provider.get("provider_fingerprint"):
+            provider_update["provider_fingerprint"] = fingerprint
+
+
+        
+        # ========== STEP 6/7: HAND UPDATE + DISCREPANCIES TO THE BATCH WRITER ==========
+        discrepancies = qa_result.get("discrepancy_records", [])
+        
+        # Log success
+        logger.info(
+            "Provider %s completed: status=%s, confidence=%s%%, risk=%s, discrepancies=%s",
+            provider_id, validation_status, confidence_score, risk_score, discrepancy_count,
+        )
+        return provider_id, validation_status, provider_update, discrepancies
+        
     except Exception as e:
-        logger.error(f"Failed to fetch providers from database: {e}")
-        return {
-            "status": "error",
-            "message": f"Failed to fetch providers: {str(e)}",
-            "validated": 0,
-            "needs_review": 0,
-            "total": 0
-        }
+        # ========== ERROR HANDLING ==========
+        # One provider failure should NOT stop the pipeline
+        # CancelledError/KeyboardInterrupt are BaseExceptions and still propagate.
+        # Tracebacks are costly to format, so only capture them when debugging;
+        # AgentError is an expected failure and never needs one.
+        if isinstance(e, AgentError):
+            logger.warning("Provider %s: %s", provider_id, e)
+        else:
+            logger.error("Provider %s: PIPELINE ERROR - %s", provider_id, e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
+        
+        # Log the event for audit trail (queued; the log writer batches inserts)
+        log_event("validation_error",
+                 f"Pipeline error for provider {provider_id}: {str(e)}",
+                 "ValidationPipeline",
+                 provider_id)
+        
+        # Mark as needs_review (saved with the next batch)
+        return provider_id, "needs_review", _changed_columns(provider, {
+            "validation_status": "needs_review",
+            "confidence_score": 0,
+            "risk_score": 100
+        }), []
+
+
+async def _process_one(provider: Dict[str, Any],
+                       sem: asyncio.Semaphore) -> Tuple[Any, str, Dict[str, Any], List[Dict[str, Any]]]:
+    """Run process_provider_record once a concurrency slot is free."""
+    async with sem:
+        return await process_provider_record(provider)
+
+
+
+async def run_validation_pipeline(limit: int = 10000,
+                                  after: Optional[Tuple[str, int]] = None,
+                                  concurrency: int = PIPELINE_CONCURRENCY,
+                                  force: bool = False) -> Dict[str, Any]:
+# async def run_validation_pipeline(provider_id: int | None = None):
+
+    logger.info(_BANNER)
+    logger.info("STARTING VALIDATION PIPELINE")
+    logger.info(_BANNER)
     
     # Initialize counters
     validated_count = 0
     needs_review_count = 0
     total_processed = 0
+    skipped_count = 0
     
-    # if provider_id:
-    #     providers = [get_provider_by_id(provider_id)]
-    # else:
-    #     providers = get_providers_to_validate()
-    # Process each provider through the pipeline
-    for provider in providers:
-        provider_id = provider.get("id", "unknown")
-        total_processed += 1
-        
+    # Results are written in batches rather than one transaction per row
+    pending_updates: List[Tuple[int, Dict[str, Any]]] = []
+    pending_discrepancies: List[Dict[str, Any]] = []
+    
+    def flush_batches() -> None:
+        if not pending_updates and not pending_discrepancies:
+            return
         try:
-            logger.info(f"[{total_processed}/{len(providers)}] Processing provider ID: {provider_id}")
-            
-            # ========== STEP 1: DATA VALIDATION AGENT ==========
-            logger.debug(f"Provider {provider_id}: Running DataValidationAgent...")
-            validated_result = await validation_agent.run(provider)
-            
-            validated_data = validated_result.get("validated_data", {})
-            # Extract confidence scores for later use
-            confidence_scores = validated_result.get("confidence_scores", {})
-            
-            # ========== STEP 2: ENRICHMENT AGENT ==========
-            logger.debug(f"Provider {provider_id}: Running EnrichmentAgent...")
-            enriched_result = await enrichment_agent.run(provider, validated_result["validated_data"])
-
-
-
-            logger.info("CONFIDENCE DEBUG >>> %s", confidence_scores)
-
-            # ========== STEP 3: QA AGENT ==========
-            logger.debug(f"Provider {provider_id}: Running QAAgent...")
-            qa_result = await qa_agent.run(
-                original=provider,
-                validated_data=validated_data,
-                enriched_data=enriched_result,
-                confidence_scores=confidence_scores
-            )
-            
-            # ========== STEP 4: DIRECTORY MANAGEMENT AGENT ==========
-            logger.debug(f"Provider {provider_id}: Running DirectoryManagementAgent...")
-            final_provider = directory_agent.run(
-                provider=provider,
-                validated_result=validated_result,
-                enriched_result=enriched_result,
-                qa_result=qa_result
-            )
-            # STEP 1: assign provider_update FIRST
-            provider_update = {
-                "confidence_score": final_provider.get("confidence_score"),
-                "risk_score": final_provider.get("risk_score"),
-                "validation_status": final_provider.get("validation_status"),
-                "validated_data": final_provider.get("validated_data"),
-                "enriched_data": final_provider.get("enriched_data"),
-            }
-            ALLOWED_PROVIDER_COLUMNS = {
-                "confidence_score",
-                "risk_score",
-                "validation_status",
-                "validated_data",
-                "enriched_data",
-            }
-
-            provider_update = {
-                k: v for k, v in provider_update.items()
-                if k in ALLOWED_PROVIDER_COLUMNS and v is not None
-            }
-
-            
-            # ========== STEP 5: PREPARE FINAL RECORD FOR DATABASE ==========
-            confidence_score = qa_result.get("confidence_score", 0)
-            risk_score = qa_result.get("risk_score", 0)
-            qa_status = qa_result.get("status", "pending")
-            discrepancy_count = qa_result.get("discrepancy_count", 0)
-            
-            # Determine validation status based on confidence
-            if confidence_score >= 60:
-                validation_status = "validated"
+            with get_db_connection():
+                bulk_update_providers(pending_updates)
+                insert_discrepancies_bulk(pending_discrepancies)
+        except Exception as e:
+            logger.error("Failed to save %s provider results: %s", len(pending_updates), e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
+        pending_updates.clear()
+        pending_discrepancies.clear()
+    
+    async def record(results: Iterable[Tuple[Any, str, Dict[str, Any], List[Dict[str, Any]]]]) -> None:
+        nonlocal validated_count, needs_review_count, total_processed
+        for provider_id, validation_status, provider_update, discrepancies in results:
+            total_processed += 1
+            if validation_status == "validated":
                 validated_count += 1
-            elif confidence_score <= 50:
-                validation_status = "needs_review"
-                needs_review_count += 1
             else:
-                validation_status = "review_recommended"
                 needs_review_count += 1
-
-            ALLOWED_PROVIDER_COLUMNS = {
-                    "confidence_score",
-                    "risk_score",
-                    "validation_status",
-                    "validated_data",
-                    "enriched_data"
-                }
-
-            
-            
-            # Prepare update dict for database
-            provider_update = {
-                "validation_status": validation_status,
-                "confidence_score": confidence_score,
-                "risk_score": risk_score,
-                # "discrepancy_count": discrepancy_count,
-                # "qa_status": qa_status,
-                # Include merged fields from final profile
-                "phone": final_provider.get("phone"),
-                "address_line1": final_provider.get("address_line1"),
-                "address_line2": final_provider.get("address_line2"),
-                "city": final_provider.get("city"),
-                "state": final_provider.get("state"),
-                "zip_code": final_provider.get("zip_code"),
-                "specialty": final_provider.get("specialty"),
-                "website": final_provider.get("website"),
-                "email": final_provider.get("email"),
-                "first_name": final_provider.get("first_name"),
-                "last_name": final_provider.get("last_name"),
-            }
-
-
-            
-            # ========== STEP 6: SAVE TO DATABASE ==========
-            logger.debug(f"Provider {provider_id}: Updating database...")
-            update_provider_after_validation(provider_id, provider_update)
-            
-            # ========== STEP 7: INSERT DISCREPANCIES ==========
-            discrepancies = qa_result.get("discrepancies", [])
-            if discrepancies:
-                logger.debug(f"Provider {provider_id}: Inserting {len(discrepancies)} discrepancies...")
-                for discrepancy in discrepancies:
-                    try:
-                        discrepancy["provider_id"] = provider_id
-                        insert_discrepancy(discrepancy)
-                    except Exception as disc_error:
-                        logger.error(f"Provider {provider_id}: Failed to insert discrepancy: {disc_error}")
-            
-            # Log success
-            log_message = (
-                f"Provider {provider_id} completed: "
-                f"status={validation_status}, "
-                f"confidence={confidence_score}%, "
-                f"risk={risk_score}, "
-                f"discrepancies={discrepancy_count}"
-            )
-            logger.info(log_message)
-            
-        except Exception as e:
-            # ========== ERROR HANDLING ==========
-            # One provider failure should NOT stop the pipeline
-            logger.error(f"Provider {provider_id}: PIPELINE ERROR - {str(e)}", exc_info=True)
+            if total_processed % PROGRESS_LOG_EVERY == 0:
+                logger.info("Processed %s providers", total_processed)
             
-            # Try to mark as needs_review and save error state
+            if provider_update:
+                pending_updates.append((provider_id, provider_update))
+            pending_discrepancies.extend(discrepancies)
+        if len(pending_updates) >= WRITE_BATCH_SIZE:
+            # SQLite calls block; run the write off the event loop
+            await asyncio.to_thread(flush_batches)
+    
+    # Stream providers from the database and process them concurrently; each
+    # task handles its own errors, so one failure never cancels the others.
+    # At most 2x concurrency providers are in memory at once.
+    sem = asyncio.Semaphore(concurrency)
+    in_flight: set = set()
+    fetch_error: Optional[Exception] = None
+    providers = iter_providers(limit=limit, after=after)
+    try:
+        while True:
+            # Only the fetch is guarded here; process_provider_record handles
+            # its own failures, so a task result never raises into this loop
             try:
-                update_provider_after_validation(provider_id, {
+                provider = await anext(providers)
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                logger.error("Failed to fetch providers from database: %s", e)
+                fetch_error = e
+                break
+            # Already validated and unchanged since: the agents would repeat themselves
+            if (not force and provider.get("validation_status") == "validated"
+                    and provider.get("provider_fingerprint") == provider_fingerprint(provider)):
+                skipped_count += 1
+                continue
+            # Nothing the agents could verify: straight to review, batched with the rest
+            if not _has_verifiable_inputs(provider):
+                await record([(provider["id"], "needs_review", _changed_columns(provider, {
                     "validation_status": "needs_review",
                     "confidence_score": 0,
-                    "risk_score": 100
-                })
-                needs_review_count += 1
-            except Exception as update_error:
-                logger.error(f"Provider {provider_id}: Failed to mark as needs_review: {update_error}")
-                needs_review_count += 1
-            
-            # Log the event for audit trail
-            try:
-                log_event("validation_error",
-                         f"Pipeline error for provider {provider_id}: {str(e)}",
-                         "ValidationPipeline",
-                         provider_id)
-            except:
-                pass
+                }), [])])
+                continue
+            if len(in_flight) >= 2 * concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                await record(task.result() for task in done)
+            in_flight.add(asyncio.create_task(_process_one(provider, sem)))
+    finally:
+        # Cancels the page prefetch if the stream was left early
+        await providers.aclose()
+    if in_flight:
+        done, _ = await asyncio.wait(in_flight)
+        await record(task.result() for task in done)
+    await asyncio.to_thread(flush_batches)
+    # Make the run's audit events visible before reporting it done
+    await asyncio.to_thread(flush_logs)
+    
+    if fetch_error is not None:
+        return {
+            "status": "error",
+            "message": f"Failed to fetch providers: {str(fetch_error)}",
+            "validated": validated_count,
+            "needs_review": needs_review_count,
+            "skipped": skipped_count,
+            "total": total_processed
+        }
     
     # ========== FINAL SUMMARY ==========
-    logger.info("=" * 80)
+    logger.info(_BANNER)
     logger.info("VALIDATION PIPELINE COMPLETE")
-    logger.info(f"Total Processed: {total_processed}")
-    logger.info(f"Validated: {validated_count}")
-    logger.info(f"Needs Review: {needs_review_count}")
-    logger.info("=" * 80)
+    logger.info("Total Processed: %s", total_processed)
+    logger.info("Validated: %s", validated_count)
+    logger.info("Needs Review: %s", needs_review_count)
+    logger.info("Skipped (unchanged): %s", skipped_count)
+    logger.info(_BANNER)
     
     return {
         "status": "success",
         "validated": validated_count,
         "needs_review": needs_review_count,
+        "skipped": skipped_count,
         "total": total_processed
     }
 
@@ -5,6 +5,7 @@ Scraping module for MedAtlas.
 from .google_scraper import validate_address_google, get_place_details
 from .website_scraper import scrape_provider_website, verify_website_exists
 from .license_scraper import verify_license, scrape_state_board
+from ._http import get_session, close_session
 
 __all__ = [
     "validate_address_google",
@@ -12,6 +13,8 @@ __all__ = [
     "scrape_provider_website",
     "verify_website_exists",
     "verify_license",
-    "scrape_state_board"
+    "scrape_state_board",
+    "get_session",
+    "close_session"
 ]
 
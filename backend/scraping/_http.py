@@ -0,0 +1,109 @@
+"""
+Shared aiohttp session handling for the scrapers.
+"""
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+# One pooled session per process: keep-alive connections and cached DNS
+# lookups are reused across scraping calls
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Transient failures (rate limits, gateway errors) are retried with
+# exponential backoff plus jitter, waiting at most RETRY_MAX_DELAY seconds
+RETRY_ATTEMPTS = 3
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared scraping session, creating it on first use.
+    
+    A session is tied to the event loop it was created on, so a new one is
+    made if the loop has changed (e.g. separate asyncio.run calls).
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=200, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=60
+            ),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared session (call on application shutdown)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Yield the caller's session, or the shared pooled session if none was given.
+    
+    The shared session is never closed here; see close_session.
+    
+    Args:
+        session: Optional aiohttp session owned by the caller
+    """
+    yield session if session is not None else await get_session()
+
+
+def _retry_delay(attempt: int, response: Optional[aiohttp.ClientResponse] = None) -> float:
+    """Seconds to wait before retrying; honors a numeric Retry-After header."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+    return min(2 ** attempt + random.random(), RETRY_MAX_DELAY)
+
+
+@asynccontextmanager
+async def request_with_retry(session: aiohttp.ClientSession, method: str, url: str, *,
+                             max_attempts: int = RETRY_ATTEMPTS, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+    """
+    Send a request, retrying connection errors, timeouts and RETRY_STATUSES.
+    
+    Used like session.request: ``async with request_with_retry(...) as response``.
+    After the last attempt the error is raised, or the final response yielded.
+    
+    Args:
+        session: aiohttp session to send the request with
+        method: HTTP method
+        url: Request URL
+        max_attempts: Total attempts, including the first
+        **kwargs: Passed through to session.request
+    """
+    for attempt in range(max_attempts):
+        last_attempt = attempt == max_attempts - 1
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+        if response.status in RETRY_STATUSES and not last_attempt:
+            delay = _retry_delay(attempt, response)
+            response.release()
+            await asyncio.sleep(delay)
+            continue
+        try:
+            yield response
+        finally:
+            response.release()
+        return
@@ -3,18 +3,53 @@ Google Places API scraper for address validation and enrichment.
 """
 
 import os
+import re
+import time
 import aiohttp
 import asyncio
-from typing import Dict, Optional, Any
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
 import logging
 
+from ._http import request_with_retry, session_scope
+
 logger = logging.getLogger(__name__)
 
 # Google Places API key (should be in environment variable)
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
 
+# Successful Places lookups are reused for a day; providers often share an
+# address (same practice) and the API is the slowest call in enrichment
+PLACES_CACHE_TTL = 24 * 3600
+PLACES_CACHE_SIZE = 10000
+
+_address_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_place_details_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def _cache_get(cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]", key: str) -> Optional[Dict[str, Any]]:
+    """Return a fresh cached value (marking it recently used), else None."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.monotonic() - stored_at >= PLACES_CACHE_TTL:
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]", key: str, value: Dict[str, Any]) -> None:
+    """Store a value, evicting the least recently used entry when full."""
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    if len(cache) > PLACES_CACHE_SIZE:
+        cache.popitem(last=False)
 
-async def validate_address_google(address: str, city: str = "", state: str = "", zip_code: str = "") -> Dict[str, Any]:
+
+async def validate_address_google(address: str, city: str = "", state: str = "", zip_code: str = "",
+                                  session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
     """
     Validate address using Google Places API.
     
@@ -23,6 +58,7 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
         city: City name
         state: State code
         zip_code: ZIP code
+        session: Optional aiohttp session to reuse pooled connections
         
     Returns:
         Dictionary with validation results and normalized address
@@ -45,9 +81,13 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
         query_parts.append(zip_code)
     
     query = ", ".join(query_parts)
+    cache_key = "|".join(part.strip().lower() for part in query_parts)
+    cached = _cache_get(_address_cache, cache_key)
+    if cached is not None:
+        return dict(cached)
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(session) as session:
             # Use Places API Text Search
             url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
             params = {
@@ -55,7 +95,7 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
                 "key": GOOGLE_PLACES_API_KEY
             }
             
-            async with session.get(url, params=params) as response:
+            async with request_with_retry(session, "GET", url, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
                     
@@ -69,7 +109,7 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
                             details = await get_place_details(place_id, session)
                             formatted_address = details.get("formatted_address", result.get("formatted_address"))
                             
-                            return {
+                            validated = {
                                 "valid": True,
                                 "formatted_address": formatted_address,
                                 "latitude": location.get("lat"),
@@ -77,6 +117,8 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
                                 "place_id": place_id,
                                 "normalized_address": parse_address(formatted_address)
                             }
+                            _cache_put(_address_cache, cache_key, validated)
+                            return dict(validated)
                     
                     return {
                         "valid": False,
@@ -90,7 +132,7 @@ async def validate_address_google(address: str, city: str = "", state: str = "",
                         "normalized_address": None
                     }
     except Exception as e:
-        logger.error(f"Error validating address: {e}")
+        logger.error("Error validating address: %s", e)
         return {
             "valid": False,
             "error": str(e),
@@ -112,6 +154,10 @@ async def get_place_details(place_id: str, session: Optional[aiohttp.ClientSessi
     if not GOOGLE_PLACES_API_KEY:
         return {}
     
+    cached = _cache_get(_place_details_cache, place_id)
+    if cached is not None:
+        return dict(cached)
+    
     url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         "place_id": place_id,
@@ -120,35 +166,44 @@ async def get_place_details(place_id: str, session: Optional[aiohttp.ClientSessi
     }
     
     try:
-        if session:
-            async with session.get(url, params=params) as response:
+        async with session_scope(session) as session:
+            async with request_with_retry(session, "GET", url, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get("status") == "OK":
-                        return data.get("result", {})
-        else:
-            async with aiohttp.ClientSession() as new_session:
-                async with new_session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == "OK":
-                            return data.get("result", {})
+                        details = data.get("result", {})
+                        _cache_put(_place_details_cache, place_id, details)
+                        return dict(details)
     except Exception as e:
-        logger.error(f"Error getting place details: {e}")
+        logger.error("Error getting place details: %s", e)
     
     return {}
 
 
+# "line1, city, ... ST 12345[-6789]" as Google formats US addresses
+# (usually followed by ", USA")
+_US_ADDRESS_RE = re.compile(
+    r'^\s*(?P<address_line1>[^,]+?)\s*,\s*(?P<city>[^,]+?)\s*,.*?\b(?P<state>[A-Z]{2})\s+(?P<zip_code>\d{5}(?:-\d{4})?)\b'
+)
+
+
 def parse_address(formatted_address: str) -> Dict[str, str]:
     """
     Parse formatted address into components.
     
+    US addresses are parsed with one regex; anything else falls back to
+    splitting on commas.
+    
     Args:
         formatted_address: Formatted address string
         
     Returns:
         Dictionary with address components
     """
+    match = _US_ADDRESS_RE.match(formatted_address)
+    if match:
+        return match.groupdict()
+    
     parts = formatted_address.split(",")
     normalized = {}
     
@@ -63,7 +63,7 @@ async def verify_license(license_number: str, state: str, provider_name: str = "
             "note": "Placeholder implementation - requires state-specific integration"
         }
     except Exception as e:
-        logger.error(f"Error verifying license: {e}")
+        logger.error("Error verifying license: %s", e)
         return {
             "verified": False,
             "error": str(e),
@@ -5,19 +5,44 @@ Website scraper for provider information extraction.
 import aiohttp
 from bs4 import BeautifulSoup
 from typing import Dict, Optional, Any
+import importlib.util
 import logging
 import re
 import asyncio
 
+from ._http import request_with_retry, session_scope
+
 logger = logging.getLogger(__name__)
 
+# lxml's C parser is much faster than Python's html.parser; use it when installed
+_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+_PHONE_RE = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# Token and length bounds keep backtracking linear on large pages
+_ADDRESS_RES = [
+    re.compile(
+        r'\b\d{1,6}\s+(?:[A-Za-z0-9]+[\s,]+){1,6}?(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Court|Ct|Way|Circle|Cir)\b[\s,]+[A-Za-z ]{2,40},\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?',
+        re.IGNORECASE,
+    ),
+]
+# In priority order: the first keyword found on the page wins
+_SPECIALTY_KEYWORDS = (
+    "specialty", "specialties", "practice", "services",
+    "cardiology", "orthopedics", "pediatrics", "dermatology"
+)
+_SPECIALTY_RES = [re.compile(keyword, re.I) for keyword in _SPECIALTY_KEYWORDS]
+# Any keyword; lets one find_all walk the tree instead of one per keyword
+_SPECIALTY_ANY_RE = re.compile("|".join(_SPECIALTY_KEYWORDS), re.I)
+
 
-async def scrape_provider_website(url: str) -> Dict[str, Any]:
+async def scrape_provider_website(url: str, session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
     """
     Scrape provider website for information.
     
     Args:
         url: Website URL
+        session: Optional aiohttp session to reuse pooled connections
         
     Returns:
         Dictionary with scraped information
@@ -26,47 +51,41 @@ async def scrape_provider_website(url: str) -> Dict[str, Any]:
         return {"error": "Invalid URL"}
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(session) as session:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
             }
             
-            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            async with request_with_retry(session, "GET", url, headers=headers,
+                                          timeout=aiohttp.ClientTimeout(total=10)) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
+                    soup = BeautifulSoup(html, _HTML_PARSER)
                     
                     extracted = {}
                     
-                    # Extract phone number
-                    phone_pattern = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-                    phone_matches = re.findall(phone_pattern, html)
-                    if phone_matches:
-                        extracted["phone"] = phone_matches[0]
+                    # Extract phone number (only the first match is used)
+                    phone_match = _PHONE_RE.search(html)
+                    if phone_match:
+                        extracted["phone"] = phone_match.group()
                     
                     # Extract email
-                    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                    email_matches = re.findall(email_pattern, html)
-                    if email_matches:
-                        extracted["email"] = email_matches[0]
+                    email_match = _EMAIL_RE.search(html)
+                    if email_match:
+                        extracted["email"] = email_match.group()
                     
                     # Extract address (look for common address patterns)
-                    address_patterns = [
-                        r'\d+\s+[A-Za-z0-9\s,]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Court|Ct|Way|Circle|Cir)[\s,]+[A-Za-z\s]+,\s*[A-Z]{2}\s+\d{5}',
-                    ]
-                    for pattern in address_patterns:
-                        matches = re.findall(pattern, html, re.IGNORECASE)
-                        if matches:
-                            extracted["address"] = matches[0]
+                    for pattern in _ADDRESS_RES:
+                        address_match = pattern.search(html)
+                        if address_match:
+                            extracted["address"] = address_match.group()
                             break
                     
-                    # Extract specialty information
-                    specialty_keywords = [
-                        "specialty", "specialties", "practice", "services",
-                        "cardiology", "orthopedics", "pediatrics", "dermatology"
-                    ]
-                    for keyword in specialty_keywords:
-                        elements = soup.find_all(string=re.compile(keyword, re.I))
+                    # Extract specialty information: walk the tree once, then
+                    # pick the matches for the highest-priority keyword
+                    keyword_elements = soup.find_all(string=_SPECIALTY_ANY_RE)
+                    for pattern in _SPECIALTY_RES:
+                        elements = [elem for elem in keyword_elements if pattern.search(elem)]
                         if elements:
                             # Try to extract nearby text
                             for elem in elements[:3]:
@@ -97,19 +116,20 @@ async def scrape_provider_website(url: str) -> Dict[str, Any]:
                         "error": f"HTTP {response.status}"
                     }
     except asyncio.TimeoutError:
-        logger.error(f"Timeout scraping {url}")
+        logger.error("Timeout scraping %s", url)
         return {"success": False, "error": "Timeout"}
     except Exception as e:
-        logger.error(f"Error scraping {url}: {e}")
+        logger.error("Error scraping %s: %s", url, e)
         return {"success": False, "error": str(e)}
 
 
-async def verify_website_exists(url: str) -> bool:
+async def verify_website_exists(url: str, session: Optional[aiohttp.ClientSession] = None) -> bool:
     """
     Verify if website URL is accessible.
     
     Args:
         url: Website URL
+        session: Optional aiohttp session to reuse pooled connections
         
     Returns:
         True if website is accessible
@@ -117,10 +137,18 @@ async def verify_website_exists(url: str) -> bool:
     if not url or not url.startswith(('http://', 'https://')):
         return False
     
+    timeout = aiohttp.ClientTimeout(total=5)
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5), allow_redirects=True) as response:
-                return response.status == 200
-    except:
+        async with session_scope(session) as session:
+            # HEAD fetches only the headers; the body is never needed here
+            async with request_with_retry(session, "HEAD", url, timeout=timeout, allow_redirects=True) as response:
+                status = response.status
+            if status == 405:
+                # Server rejects HEAD; ask for a single byte instead
+                async with request_with_retry(session, "GET", url, timeout=timeout, allow_redirects=True,
+                                              headers={"Range": "bytes=0-0"}) as response:
+                    status = response.status
+            return 200 <= status < 400
+    except (aiohttp.ClientError, asyncio.TimeoutError):
         return False
 
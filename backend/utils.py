@@ -2,40 +2,117 @@
 Utility functions for MedAtlas.
 """
 
+import os
 import re
 import phonenumbers
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 from phonenumbers import geocoder, carrier
 
+# ZIP codes are ASCII digits; [0-9] also skips Unicode digit-class checks
+_NON_DIGIT_RE = re.compile(r'[^0-9]')
+_E164 = phonenumbers.PhoneNumberFormat.E164
+# Characters not allowed in stored filenames, each mapped to '_'
+_FNAME_TRANS = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
 
-def validate_phone(phone: str, country_code: str = "US") -> Dict[str, Any]:
+# Providers at one practice share phone numbers, addresses and specialties,
+# so the normalizers below memoize their results
+NORMALIZE_CACHE_SIZE = 65536
+
+# Full state names (upper case) to their 2-letter USPS codes
+_STATE_ABBREV = {
+    'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR',
+    'CALIFORNIA': 'CA', 'COLORADO': 'CO', 'CONNECTICUT': 'CT', 'DELAWARE': 'DE',
+    'FLORIDA': 'FL', 'GEORGIA': 'GA', 'HAWAII': 'HI', 'IDAHO': 'ID',
+    'ILLINOIS': 'IL', 'INDIANA': 'IN', 'IOWA': 'IA', 'KANSAS': 'KS',
+    'KENTUCKY': 'KY', 'LOUISIANA': 'LA', 'MAINE': 'ME', 'MARYLAND': 'MD',
+    'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI', 'MINNESOTA': 'MN', 'MISSISSIPPI': 'MS',
+    'MISSOURI': 'MO', 'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV',
+    'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM', 'NEW YORK': 'NY',
+    'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND', 'OHIO': 'OH', 'OKLAHOMA': 'OK',
+    'OREGON': 'OR', 'PENNSYLVANIA': 'PA', 'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC',
+    'SOUTH DAKOTA': 'SD', 'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT',
+    'VERMONT': 'VT', 'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV',
+    'WISCONSIN': 'WI', 'WYOMING': 'WY',
+    'DISTRICT OF COLUMBIA': 'DC', 'PUERTO RICO': 'PR'
+}
+
+# Common specialty spellings, keyed in casefold form, to their canonical names
+_SPECIALTY_MAP = {
+    "internal medicine": "Internal Medicine",
+    "family practice": "Family Medicine",
+    "family med": "Family Medicine",
+    "cardiology": "Cardiology",
+    "orthopedics": "Orthopedic Surgery",
+    "ortho": "Orthopedic Surgery",
+    "pediatrics": "Pediatrics",
+    "peds": "Pediatrics",
+    "dermatology": "Dermatology",
+    "derm": "Dermatology",
+    "psychiatry": "Psychiatry",
+    "psych": "Psychiatry",
+    "ob/gyn": "Obstetrics and Gynecology",
+    "obgyn": "Obstetrics and Gynecology",
+    "emergency medicine": "Emergency Medicine",
+    "er": "Emergency Medicine",
+    "general surgery": "General Surgery",
+    "surgery": "General Surgery"
+}
+
+
+@dataclass(slots=True, frozen=True)
+class PhoneValidation:
+    """Result of validate_phone."""
+    valid: bool
+    formatted: Optional[str]
+    country: Optional[str] = None
+    carrier: Optional[str] = None
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def validate_phone(phone: str, country_code: str = "US") -> PhoneValidation:
     """
     Validate phone number using phonenumbers library.
     
+    Results are cached, so repeated numbers share one (immutable) instance.
+    
     Args:
         phone: Phone number string
         country_code: Country code (default: US)
         
     Returns:
-        Dictionary with validation results
+        PhoneValidation with the validation results
     """
     try:
         parsed = phonenumbers.parse(phone, country_code)
         is_valid = phonenumbers.is_valid_number(parsed)
-        formatted = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+        formatted = phonenumbers.format_number(parsed, _E164)
+        
+        if not is_valid:
+            # The geocoder has no region for an invalid number and always answers ""
+            return PhoneValidation(valid=False, formatted=formatted, country="")
         
-        return {
-            "valid": is_valid,
-            "formatted": formatted,
-            "country": geocoder.description_for_number(parsed, "en"),
-            "carrier": carrier.name_for_number(parsed, "en") if is_valid else None
-        }
+        return PhoneValidation(
+            valid=True,
+            formatted=formatted,
+            country=geocoder.description_for_number(parsed, "en"),
+            carrier=carrier.name_for_number(parsed, "en"),
+        )
     except Exception as e:
-        return {
-            "valid": False,
-            "formatted": None,
-            "error": str(e)
-        }
+        return PhoneValidation(valid=False, formatted=None, error=str(e))
+
+
+def _warm_phone_metadata() -> None:
+    """Load the US number, geocoder and carrier metadata that phonenumbers reads lazily."""
+    sample = phonenumbers.parse("+12025550123", None)
+    geocoder.description_for_number(sample, "en")
+    carrier.name_for_number(sample, "en")
+
+
+# Pay the metadata load at import instead of on the first request
+_warm_phone_metadata()
 
 
 def normalize_address(address: Dict[str, Any]) -> Dict[str, Any]:
@@ -48,45 +125,58 @@ def normalize_address(address: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Normalized address dictionary
     """
+    return dict(_normalize_address(
+        address.get('address_line1'), address.get('address_line2'), address.get('city'),
+        address.get('state'), address.get('zip_code'),
+    ))
+
+
+def _title(value: str) -> str:
+    """str.title(), skipped when the value is already title-cased (istitle() implies title() is a no-op)."""
+    return value if value.istitle() else value.title()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_address(address_line1: Optional[str], address_line2: Optional[str], city: Optional[str],
+                       state: Optional[str], zip_code: Any) -> Tuple[Tuple[str, str], ...]:
+    """normalize_address on the individual fields, returning hashable items so it can be cached."""
     normalized = {}
     
     # Normalize street address
-    if address.get('address_line1'):
-        normalized['address_line1'] = address['address_line1'].strip().title()
+    if address_line1:
+        normalized['address_line1'] = _title(address_line1.strip())
     
-    if address.get('address_line2'):
-        normalized['address_line2'] = address['address_line2'].strip().title()
+    if address_line2:
+        normalized['address_line2'] = _title(address_line2.strip())
     
     # Normalize city
-    if address.get('city'):
-        normalized['city'] = address['city'].strip().title()
+    if city:
+        normalized['city'] = _title(city.strip())
     
     # Normalize state (uppercase, 2-letter code)
-    if address.get('state'):
-        state = address['state'].strip().upper()
+    if state:
+        state = state.strip().upper()
         if len(state) > 2:
             # Convert full state name to abbreviation if needed
-            state_abbrev = {
-                'CALIFORNIA': 'CA', 'TEXAS': 'TX', 'FLORIDA': 'FL',
-                'NEW YORK': 'NY', 'ILLINOIS': 'IL', 'PENNSYLVANIA': 'PA',
-                'OHIO': 'OH', 'GEORGIA': 'GA', 'NORTH CAROLINA': 'NC',
-                'MICHIGAN': 'MI'
-            }
-            normalized['state'] = state_abbrev.get(state, state[:2])
+            normalized['state'] = _STATE_ABBREV.get(state, state[:2])
         else:
             normalized['state'] = state
     
     # Normalize ZIP code
-    if address.get('zip_code'):
-        zip_code = re.sub(r'[^\d]', '', str(address['zip_code']))
+    if zip_code:
+        zip_code = str(zip_code)
+        # Most ZIPs are already plain digits; only run the regex when they are not
+        if not (zip_code.isascii() and zip_code.isdecimal()):
+            zip_code = _NON_DIGIT_RE.sub('', zip_code)
         if len(zip_code) == 9:
             normalized['zip_code'] = f"{zip_code[:5]}-{zip_code[5:]}"
         else:
             normalized['zip_code'] = zip_code[:5]
     
-    return normalized
+    return tuple(normalized.items())
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_specialty(specialty: str) -> str:
     """
     Normalize medical specialty names.
@@ -100,31 +190,28 @@ def normalize_specialty(specialty: str) -> str:
     if not specialty:
         return ""
     
-    specialty = specialty.strip().title()
-    
-    # Common specialty mappings
-    mappings = {
-        "Internal Medicine": "Internal Medicine",
-        "Family Practice": "Family Medicine",
-        "Family Med": "Family Medicine",
-        "Cardiology": "Cardiology",
-        "Orthopedics": "Orthopedic Surgery",
-        "Ortho": "Orthopedic Surgery",
-        "Pediatrics": "Pediatrics",
-        "Peds": "Pediatrics",
-        "Dermatology": "Dermatology",
-        "Derm": "Dermatology",
-        "Psychiatry": "Psychiatry",
-        "Psych": "Psychiatry",
-        "Ob/Gyn": "Obstetrics and Gynecology",
-        "OBGYN": "Obstetrics and Gynecology",
-        "Emergency Medicine": "Emergency Medicine",
-        "ER": "Emergency Medicine",
-        "General Surgery": "General Surgery",
-        "Surgery": "General Surgery"
-    }
-    
-    return mappings.get(specialty, specialty)
+    specialty = specialty.strip()
+    
+    # Known spellings map straight to the canonical name; others are title-cased
+    mapped = _SPECIALTY_MAP.get(specialty.casefold())
+    return mapped if mapped is not None else _title(specialty)
+
+
+# (none, present only, validated, validated and present) points per check
+_NPI_POINTS = (0, 10, 20, 20)
+_ADDRESS_POINTS = (0, 10, 20, 20)
+_PHONE_POINTS = (0, 7, 15, 15)
+_LICENSE_POINTS = (0, 7, 15, 15)
+_WEBSITE_POINTS = (0, 5, 10, 10)
+# Data completeness: points scale with how many of these fields are filled in
+_COMPLETENESS_FIELDS = ('npi', 'first_name', 'last_name', 'address_line1',
+                        'city', 'state', 'zip_code', 'phone')
+_COMPLETENESS_POINTS = 20
+# Sum of full points, plus the completeness points
+_CONFIDENCE_MAX_SCORE = sum(points[-1] for points in (
+    _NPI_POINTS, _ADDRESS_POINTS, _PHONE_POINTS, _LICENSE_POINTS, _WEBSITE_POINTS,
+)) + _COMPLETENESS_POINTS
+_POINTS_PER_FIELD = _COMPLETENESS_POINTS / len(_COMPLETENESS_FIELDS)
 
 
 def calculate_confidence_score(provider_data: Dict[str, Any], 
@@ -139,54 +226,29 @@ def calculate_confidence_score(provider_data: Dict[str, Any],
     Returns:
         Confidence score (0-100)
     """
-    score = 0
-    max_score = 0
-    
-    # NPI validation (20 points)
-    max_score += 20
-    if validation_results.get('npi_valid'):
-        score += 20
-    elif provider_data.get('npi'):
-        score += 10  # Partial credit if NPI exists but not validated
-    
-    # Address validation (20 points)
-    max_score += 20
-    if validation_results.get('address_valid'):
-        score += 20
-    elif provider_data.get('address_line1') and provider_data.get('city'):
-        score += 10
-    
-    # Phone validation (15 points)
-    max_score += 15
-    if validation_results.get('phone_valid'):
-        score += 15
-    elif provider_data.get('phone'):
-        score += 7
-    
-    # License validation (15 points)
-    max_score += 15
-    if validation_results.get('license_valid'):
-        score += 15
-    elif provider_data.get('license_number'):
-        score += 7
-    
-    # Website validation (10 points)
-    max_score += 10
-    if validation_results.get('website_valid'):
-        score += 10
-    elif provider_data.get('website'):
-        score += 5
+    # Each check scores points[validated << 1 | present]: full points when
+    # validated, partial credit when only present, else nothing
+    score = (
+        _NPI_POINTS[bool(validation_results.get('npi_valid')) << 1 | bool(provider_data.get('npi'))]
+        + _ADDRESS_POINTS[bool(validation_results.get('address_valid')) << 1
+                          | bool(provider_data.get('address_line1') and provider_data.get('city'))]
+        + _PHONE_POINTS[bool(validation_results.get('phone_valid')) << 1 | bool(provider_data.get('phone'))]
+        + _LICENSE_POINTS[bool(validation_results.get('license_valid')) << 1
+                          | bool(provider_data.get('license_number'))]
+        + _WEBSITE_POINTS[bool(validation_results.get('website_valid')) << 1 | bool(provider_data.get('website'))]
+    )
+    max_score = _CONFIDENCE_MAX_SCORE
     
     # Data completeness (20 points)
-    max_score += 20
-    required_fields = ['npi', 'first_name', 'last_name', 'address_line1', 
-                      'city', 'state', 'zip_code', 'phone']
-    present_fields = sum(1 for field in required_fields if provider_data.get(field))
-    score += int((present_fields / len(required_fields)) * 20)
+    present_fields = sum(1 for field in _COMPLETENESS_FIELDS if provider_data.get(field))
+    score += int(present_fields * _POINTS_PER_FIELD)
     
     return min(100, int((score / max_score) * 100))
 
 
+_HIGH_RISK_FIELDS = frozenset({'npi', 'license_number', 'address_line1', 'phone'})
+
+
 def calculate_risk_score(discrepancies: list, confidence_score: int) -> int:
     """
     Calculate risk score (0-100) based on discrepancies and confidence.
@@ -206,13 +268,9 @@ def calculate_risk_score(discrepancies: list, confidence_score: int) -> int:
     elif confidence_score < 70:
         risk += 20
     
-    # Risk from discrepancies
-    high_risk_fields = ['npi', 'license_number', 'address_line1', 'phone']
-    for disc in discrepancies:
-        if disc.get('field_name') in high_risk_fields:
-            risk += 15
-        else:
-            risk += 5
+    # Risk from discrepancies: 15 per high-risk field, 5 for any other
+    high_risk = sum(1 for disc in discrepancies if disc.get('field_name') in _HIGH_RISK_FIELDS)
+    risk += 15 * high_risk + 5 * (len(discrepancies) - high_risk)
     
     return min(100, risk)
 
@@ -227,16 +285,21 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    # Remove path components
-    filename = filename.split('/')[-1].split('\\')[-1]
+    # Remove path components ('/' is a separator on every OS, so fold '\\' into it)
+    filename = os.path.basename(filename.replace('\\', '/'))
     
-    # Remove invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    # Remove invalid characters (a single-character class, so translate beats the regex engine)
+    filename = filename.translate(_FNAME_TRANS)
     
     # Limit length
     if len(filename) > 255:
-        name, ext = filename.rsplit('.', 1) if '.' in filename else (filename, '')
-        filename = name[:250] + '.' + ext
+        name, _, ext = filename.rpartition('.')
+        keep = 255 - len(ext) - 1
+        if not name or keep <= 0:
+            # No extension (or an extension too long to keep): plain cut
+            filename = filename[:255]
+        else:
+            filename = f"{name[:keep]}.{ext}"
     
     return filename
 
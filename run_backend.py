@@ -13,7 +13,21 @@ sys.path.insert(0, str(project_root))
 
 if __name__ == "__main__":
     import uvicorn
-    from MedAtlas.backend.main import app
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # One worker by default: each worker builds its own CPU-sized OCR process
+    # pool and in-process caches, so raise MEDATLAS_WORKERS deliberately.
+    # Auto-reload is for development only (MEDATLAS_RELOAD=1): it adds a
+    # supervisor process and only works with a single worker.
+    reload = os.getenv("MEDATLAS_RELOAD", "0") == "1"
+    workers = 1 if reload else int(os.getenv("MEDATLAS_WORKERS", "1"))
+    
+    uvicorn.run(
+        "backend.api_main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        reload=reload,
+        limit_concurrency=256,
+        backlog=2048,
+    )
 
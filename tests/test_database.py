@@ -0,0 +1,116 @@
+"""
+Regression tests for the bulk insert, keyset pagination and
+cached_discrepancies behaviour of backend.database.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from backend import database as db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the database module at a fresh file for one test."""
+    db.flush_logs()
+    with db._LOCK:
+        if db._CONN is not None:
+            db._CONN.close()
+        db._CONN = None
+        monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "medatlas.db"))
+    db.init_database()
+    yield db
+    db.flush_logs()
+    with db._LOCK:
+        db._CONN.close()
+        db._CONN = None
+
+
+def _providers(count, prefix="1"):
+    return [{"npi": f"{prefix}{i:09d}", "first_name": f"P{i}"} for i in range(count)]
+
+
+def _cached_ids(provider_id):
+    cached = db.get_provider(provider_id)["cached_discrepancies"]
+    return [d["id"] for d in json.loads(cached or "[]")]
+
+
+def _discrepancy_ids(provider_id):
+    return [d["id"] for d in db.get_discrepancies(provider_id=provider_id)]
+
+
+def test_insert_providers_bulk_ids_follow_input_order(temp_db):
+    # More rows than one multi-row VALUES batch
+    providers = _providers(db.PROVIDER_INSERT_BATCH + 37)
+    ids = db.insert_providers_bulk(providers)
+
+    assert len(ids) == len(providers)
+    assert ids == sorted(ids)
+    for provider_id, provider in zip(ids, providers):
+        assert db.get_provider_scalar(provider_id)["npi"] == provider["npi"]
+
+
+def test_insert_providers_bulk_raw_data_json_per_row(temp_db):
+    providers = _providers(3)
+    raw = [json.dumps({"row": i, "text": text}) for i, text in enumerate(["a b", "c\x85d", "e"])]
+    ids = db.insert_providers_bulk(providers, raw_data_json=raw)
+
+    assert [db.get_provider_blob(i, "raw_data")["row"] for i in ids] == [0, 1, 2]
+    with pytest.raises(ValueError):
+        db.insert_providers_bulk(_providers(2, prefix="2"), raw_data_json=raw)
+
+
+def test_keyset_pages_neither_skip_nor_repeat(temp_db):
+    # Rows inserted together share created_at, so id must break the ties
+    db.insert_providers_bulk(_providers(53))
+    expected = [p["id"] for p in db.get_all_providers(limit=1000, include_json=False)]
+
+    seen = []
+    after = None
+    while True:
+        page = db.get_all_providers(limit=7, after=after, include_json=False)
+        if not page:
+            break
+        seen.extend(p["id"] for p in page)
+        after = (page[-1]["created_at"], page[-1]["id"])
+
+    assert seen == expected
+    assert len(set(seen)) == 53
+
+
+def test_iter_providers_matches_get_all_providers(temp_db):
+    db.insert_providers_bulk(_providers(23))
+    expected = [p["id"] for p in db.get_all_providers(limit=1000)]
+
+    async def collect(**kwargs):
+        return [p["id"] async for p in db.iter_providers(batch_size=5, **kwargs)]
+
+    assert asyncio.run(collect()) == expected
+    assert asyncio.run(collect(limit=12)) == expected[:12]
+
+
+def test_cached_discrepancies_track_inserts_updates_and_deletes(temp_db):
+    first, second = db.insert_providers_bulk(_providers(2))
+
+    bulk_ids = db.insert_discrepancies_bulk(
+        [{"provider_id": first, "field_name": f"field{i}"} for i in range(3)]
+        + [{"provider_id": second, "field_name": "phone"}]
+    )
+    single_id = db.insert_discrepancy({"provider_id": second, "field_name": "city"})
+    assert len(bulk_ids) == 4
+    for provider_id in (first, second):
+        assert _cached_ids(provider_id) == _discrepancy_ids(provider_id)
+
+    # Moving a discrepancy refreshes both the old and the new provider
+    with db.get_db_connection() as conn:
+        conn.execute("UPDATE discrepancies SET provider_id = ? WHERE id = ?", (second, bulk_ids[0]))
+    assert bulk_ids[0] not in _cached_ids(first)
+    for provider_id in (first, second):
+        assert _cached_ids(provider_id) == _discrepancy_ids(provider_id)
+
+    with db.get_db_connection() as conn:
+        conn.execute("DELETE FROM discrepancies WHERE id = ?", (single_id,))
+    assert _cached_ids(second) == _discrepancy_ids(second)
+    assert single_id not in _cached_ids(second)
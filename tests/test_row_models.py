@@ -0,0 +1,39 @@
+"""
+Regression tests for building API models from database rows.
+"""
+
+from datetime import datetime
+
+from backend.api.endpoints.discrepancies import _row_to_disc
+from backend.api.endpoints.providers import _row_to_provider
+
+
+def test_row_to_disc_parses_sqlite_timestamp():
+    disc = _row_to_disc({
+        "id": 1, "provider_id": 2, "field_name": "phone", "csv_value": "1",
+        "api_value": "2", "scraped_value": None, "final_value": "2",
+        "confidence": 80, "risk_level": "medium", "status": "open", "notes": None,
+        "created_at": "2024-05-01 12:30:00",
+    })
+
+    assert disc.created_at == datetime(2024, 5, 1, 12, 30)
+    assert disc.model_dump(mode="json")["created_at"] == "2024-05-01T12:30:00"
+
+
+def test_row_to_provider_parses_sqlite_timestamps():
+    row = {field: None for field in (
+        "npi", "first_name", "last_name", "organization_name", "provider_type",
+        "specialty", "address_line1", "address_line2", "city", "state", "zip_code",
+        "phone", "email", "website", "license_number", "license_state",
+        "practice_name", "source_file", "raw_data", "validated_data", "enriched_data",
+    )}
+    row.update({
+        "id": 7, "confidence_score": 0, "risk_score": 0, "validation_status": "pending",
+        "created_at": "2024-05-01 12:30:00", "updated_at": "2024-05-02 08:00:00",
+        "cached_discrepancies": "[]",
+    })
+    provider = _row_to_provider(row)
+
+    dumped = provider.model_dump(mode="json")
+    assert dumped["created_at"] == "2024-05-01T12:30:00"
+    assert dumped["updated_at"] == "2024-05-02T08:00:00"